@@ -1,9 +1,10 @@
-from cwl_performance_analyzer import COC_API_TOKEN,COC_BASE_API_URL,COC_CLAN_TAG
+from cwl_core.client import get_coc_api_response
+from cwl_core.config import get_config
+from cwl_core.profiling import add_profile_arguments, profile_run
 
+from argparse import ArgumentParser
 import urllib.parse
 
-import requests
-
 
 class Player:
     
@@ -18,12 +19,7 @@ class Player:
 def get_raid_weekend_participants(clan_tag: str):
     # Encode the clan tag
     encoded_clan_tag = urllib.parse.quote(clan_tag)
-    raid_weekend_response = requests.get(url=f"{COC_BASE_API_URL}/clans/{encoded_clan_tag}/capitalraidseasons",
-                                         headers={
-                                             "Accept": "application/json",
-                                             "Authorization": f"Bearer {COC_API_TOKEN}"
-                                         }
-    )
+    raid_weekend_response = get_coc_api_response(f"/clans/{encoded_clan_tag}/capitalraidseasons")
     
     # Convert the response to JSON and return it.
     raid_weekend_json = raid_weekend_response.json()
@@ -38,12 +34,7 @@ def get_raid_weekend_participants(clan_tag: str):
 def get_clan_members(clan_tag: str) -> list[Player]:
     # Encode the clan tag
     encoded_clan_tag = urllib.parse.quote(clan_tag)
-    clan_info_response = requests.get(url=f"{COC_BASE_API_URL}/clans/{encoded_clan_tag}",
-                                         headers={
-                                             "Accept": "application/json",
-                                             "Authorization": f"Bearer {COC_API_TOKEN}"
-                                         }
-    )
+    clan_info_response = get_coc_api_response(f"/clans/{encoded_clan_tag}")
     
     # Convert the response to a list of clan members.
     clan_info_json = clan_info_response.json()
@@ -69,12 +60,18 @@ def print_non_participants(raid_weekend_participants: list[Player], clan_members
 
 
 def main():
-    raid_weekend_participants = get_raid_weekend_participants(COC_CLAN_TAG)
+    clan_tag = get_config().coc_clan_tag
+    raid_weekend_participants = get_raid_weekend_participants(clan_tag)
     
-    clan_members = get_clan_members(COC_CLAN_TAG)
+    clan_members = get_clan_members(clan_tag)
     
     print_non_participants(raid_weekend_participants, clan_members)
 
 
 if __name__ == "__main__":
-    main()
+    parser = ArgumentParser(description="List the clan members who did not participate in the last raid weekend.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    with profile_run(args.profile, "capital_raid_analyzer", args.profile_top, args.profile_dir):
+        main()
@@ -79,6 +79,7 @@ class CWLWar:
     opponent: WarClan
     warStartTime: str
     home_clan_tag: str
+    war_tag: str = ""
 
     def __post_init__(self):
         self.clan = WarClan(**self.clan)
@@ -0,0 +1,32 @@
+from dataclasses import dataclass, field, fields
+from typing import List
+
+
+@dataclass
+class PlayerHero:
+    name: str
+    level: int
+    maxLevel: int
+    village: str
+
+@dataclass
+class Player:
+    tag: str
+    name: str
+    townHallLevel: int
+    warStars: int
+    trophies: int
+    heroes: List[PlayerHero] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self.heroes = [PlayerHero(**hero) for hero in self.heroes]
+    
+    @classmethod
+    def from_json(cls, player_json: dict) -> "Player":
+        # The API returns far more about a player than is needed, so only keep our fields.
+        player_fields = {player_field.name for player_field in fields(cls)}
+        heroes = [{key: hero[key] for key in ("name", "level", "maxLevel", "village")} for hero in player_json.get("heroes", [])]
+        return cls(**{key: value for key,value in player_json.items() if key in player_fields and key != "heroes"}, heroes=heroes)
+    
+    def get_home_heroes(self) -> List[PlayerHero]:
+        return [hero for hero in self.heroes if hero.village == "home"]
@@ -0,0 +1,181 @@
+from cwl_core.config import get_config, get_cwl_data_file_path, get_cwl_event_log_file_path, get_cwl_run_report_file_path
+from cwl_core.event_log import EVENT_FIELDS_ATTRIBUTE, EVENT_LOG, add_verbosity_arguments, configure_event_log
+from cwl_core.profiling import add_profile_arguments, profile_run
+from cwl_core.run_metrics import RUN_METRICS
+
+from argparse import ArgumentParser, Namespace
+import time
+
+
+# ====================== Environment / Global Variables =======================
+WATCH_DEFAULT_INTERVAL_SECONDS = 15
+WATCH_DEFAULT_PUSH_INTERVAL_SECONDS = 300
+
+# The shortest time between two pushes to the .CSV file and Google sheets when polls keep
+# finding changes, so a busy war doesn't exhaust the Google Sheets write quota.
+WATCH_MIN_PUSH_INTERVAL_SECONDS = 60
+
+
+# ================================= Functions =================================
+# Each command imports the module it runs on its own, so a command only pays for the
+# imports it needs (e.g. "raid" never loads the CWL analyzer).
+def run_cwl_command(args: Namespace) -> None:
+    from cwl_performance_analyzer import CWLGroupNotFoundError, run_cwl_analysis
+    
+    clan_tag = args.clan_tag or get_config().coc_clan_tag
+    try:
+        run_cwl_analysis(clan_tag, get_cwl_data_file_path(), push_to_google_sheets=not args.no_sheets,
+                         enrich_player_profiles=not args.no_player_profiles,
+                         run_report_file_path=get_cwl_run_report_file_path())
+    except CWLGroupNotFoundError as error:
+        _log_cwl_group_not_found(error)
+        raise SystemExit(1)
+
+
+def run_raid_command(args: Namespace) -> None:
+    from capital_raid_analyzer import get_clan_members, get_raid_weekend_participants, print_non_participants
+    
+    clan_tag = args.clan_tag or get_config().coc_clan_tag
+    print_non_participants(get_raid_weekend_participants(clan_tag), get_clan_members(clan_tag))
+
+
+def run_backfill_command(args: Namespace) -> None:
+    from cwl_performance_analyzer import CWLGroupNotFoundError, run_cwl_analysis
+    
+    # Analyze each clan into its own .CSV file and run report, skipping clans not in CWL.
+    failed_clan_tags = list()
+    for clan_tag in args.clan_tags:
+        RUN_METRICS.reset()
+        try:
+            run_cwl_analysis(clan_tag, get_cwl_data_file_path(clan_tag), push_to_google_sheets=False,
+                             enrich_player_profiles=not args.no_player_profiles,
+                             run_report_file_path=get_cwl_run_report_file_path(clan_tag))
+        except CWLGroupNotFoundError as error:
+            _log_cwl_group_not_found(error)
+            failed_clan_tags.append(clan_tag)
+    
+    if failed_clan_tags:
+        raise SystemExit(1)
+
+
+def run_watch_command(args: Namespace) -> None:
+    from cwl_performance_analyzer import CWLGroupNotFoundError, run_cwl_analysis
+    from war_events import JSONLinesFileSink, UnixSocketSink, WarChangePublisher, WebhookSink
+    
+    # Set up where the changes noticed between runs are sent.
+    event_sinks = list()
+    if args.events_file:
+        event_sinks.append(JSONLinesFileSink(args.events_file))
+    if args.events_socket:
+        event_sinks.append(UnixSocketSink(args.events_socket))
+    if args.events_webhook:
+        event_sinks.append(WebhookSink(args.events_webhook))
+    war_change_publisher = WarChangePublisher(event_sinks)
+    
+    # Poll the wars that have not ended on a short interval and publish what changed. The
+    # full analysis (which also pushes the .CSV file and Google sheets, and notices new
+    # rounds and roster changes) only runs on the push interval, or sooner once a poll
+    # found changes. Each run report covers the polls since the previous one.
+    clan_tag = args.clan_tag or get_config().coc_clan_tag
+    last_analysis_time = None
+    has_unpushed_changes = False
+    try:
+        while True:
+            try:
+                seconds_since_analysis = time.monotonic() - last_analysis_time if last_analysis_time is not None else None
+                if (seconds_since_analysis is None or seconds_since_analysis >= args.push_interval
+                        or (has_unpushed_changes and seconds_since_analysis >= WATCH_MIN_PUSH_INTERVAL_SECONDS)):
+                    last_analysis_time = time.monotonic()
+                    try:
+                        run_cwl_analysis(clan_tag, get_cwl_data_file_path(), push_to_google_sheets=not args.no_sheets,
+                                         enrich_player_profiles=not args.no_player_profiles,
+                                         extra_sinks=[war_change_publisher],
+                                         run_report_file_path=get_cwl_run_report_file_path())
+                    finally:
+                        RUN_METRICS.reset()
+                    has_unpushed_changes = False
+                else:
+                    with RUN_METRICS.stage("poll_war_changes"):
+                        if war_change_publisher.poll_wars():
+                            has_unpushed_changes = True
+            except CWLGroupNotFoundError as error:
+                # The clan is between CWL seasons, so keep checking until the next one starts.
+                _log_cwl_group_not_found(error)
+            except Exception as error:
+                # A failed poll or analysis (e.g. the API or Google sheets being down) is retried,
+                # and the data is pushed again as soon as the shortest push interval allows.
+                has_unpushed_changes = True
+                EVENT_LOG.warning("Watching the CWL wars failed, trying again in %s seconds: %s: %s", args.interval,
+                                  type(error).__name__, error, extra={EVENT_FIELDS_ATTRIBUTE: {"clan_tag": clan_tag}})
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        war_change_publisher.close()
+
+
+def _log_cwl_group_not_found(error: Exception) -> None:
+    EVENT_LOG.error(str(error), extra={EVENT_FIELDS_ATTRIBUTE: {"clan_tag": error.clan_tag}})
+
+
+def build_argument_parser() -> ArgumentParser:
+    parser = ArgumentParser(description="Analyze the performance of a Clash of Clans clan's members.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    # Options shared by every command.
+    common_options = ArgumentParser(add_help=False)
+    add_profile_arguments(common_options)
+    add_verbosity_arguments(common_options)
+    
+    # Options shared by the CWL analysis commands.
+    cwl_options = ArgumentParser(add_help=False)
+    cwl_options.add_argument("--no-player-profiles", action="store_true",
+                             help="Don't add the members' hero levels, war stars and trophies to the data.")
+    
+    cwl_parser = commands.add_parser("cwl", parents=[common_options, cwl_options],
+                                     help="Analyze the clan's CWL performance and push it to Google sheets.")
+    cwl_parser.add_argument("--clan-tag", help="The clan to analyze (default: COC_CLAN_TAG).")
+    cwl_parser.add_argument("--no-sheets", action="store_true", help="Don't push the data to Google sheets.")
+    cwl_parser.set_defaults(handler=run_cwl_command)
+    
+    raid_parser = commands.add_parser("raid", parents=[common_options],
+                                      help="List the clan members who did not participate in the last raid weekend.")
+    raid_parser.add_argument("--clan-tag", help="The clan to check (default: COC_CLAN_TAG).")
+    raid_parser.set_defaults(handler=run_raid_command)
+    
+    backfill_parser = commands.add_parser("backfill", parents=[common_options, cwl_options],
+                                          help="Write the CWL performance .CSV data of several clans.")
+    backfill_parser.add_argument("clan_tags", nargs="+", metavar="CLAN_TAG", help="The clans to analyze.")
+    backfill_parser.set_defaults(handler=run_backfill_command)
+    
+    watch_parser = commands.add_parser("watch", parents=[common_options, cwl_options],
+                                       help="Poll the CWL wars for changes and keep the data up to date until interrupted.")
+    watch_parser.add_argument("--clan-tag", help="The clan to analyze (default: COC_CLAN_TAG).")
+    watch_parser.add_argument("--interval", type=float, default=WATCH_DEFAULT_INTERVAL_SECONDS, metavar="SECONDS",
+                              help=f"Seconds to wait between polls of the wars (default: {WATCH_DEFAULT_INTERVAL_SECONDS}).")
+    watch_parser.add_argument("--push-interval", type=float, default=WATCH_DEFAULT_PUSH_INTERVAL_SECONDS, metavar="SECONDS",
+                              help="Longest time between full analyses that push the data (default: "
+                                   f"{WATCH_DEFAULT_PUSH_INTERVAL_SECONDS}). Changes found by a poll are pushed after "
+                                   f"at least {WATCH_MIN_PUSH_INTERVAL_SECONDS} seconds.")
+    watch_parser.add_argument("--no-sheets", action="store_true", help="Don't push the data to Google sheets.")
+    watch_parser.add_argument("--events-file", metavar="PATH", help="Append new attacks and other war changes to a JSON lines file.")
+    watch_parser.add_argument("--events-socket", metavar="PATH", help="Send war changes as JSON datagrams to a Unix socket.")
+    watch_parser.add_argument("--events-webhook", metavar="URL", help="POST war changes as JSON to a webhook.")
+    watch_parser.set_defaults(handler=run_watch_command)
+    
+    return parser
+
+
+def main():
+    """
+    This function will run the command given on the command line.
+    """
+    
+    args = build_argument_parser().parse_args()
+    configure_event_log(args.verbosity, args.log_file or get_cwl_event_log_file_path())
+    with profile_run(args.profile, f"cwl_cli_{args.command}", args.profile_top, args.profile_dir):
+        args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+The lightweight core shared by every command: configuration, the Clash of Clans API
+client, run metrics and profiling. Nothing in this package imports pandas or gspread, so
+commands that don't need them start quickly.
+"""
@@ -0,0 +1,109 @@
+from cwl_core.config import COC_API_TIMEOUT_SECONDS, COC_BASE_API_URL, CWL_CACHE_DIRECTORY, get_config
+from cwl_core.files import write_file_atomically
+from cwl_core.run_metrics import RUN_METRICS
+
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import requests
+
+
+# ====================== Environment / Global Variables =======================
+# Wars that have ended never change, so their responses are kept on disk.
+CWL_WAR_CACHE_DIRECTORY = f"{CWL_CACHE_DIRECTORY}/wars"
+
+# Each thread keeps its own session so requests reuse connections to the API.
+_thread_local = threading.local()
+
+
+# ================================= Functions =================================
+def get_coc_api_response(api_path: str) -> requests.Response:
+    """
+    Return the response of a GET request to the Clash of Clans API, recording the request
+    in the run metrics.
+    
+    Args:
+        api_path (str): The path of the API endpoint, relative to the base API URL.
+    
+    Returns:
+        requests.Response: The response from the Clash of Clans API.
+    
+    Raises:
+        requests.RequestException: If the request failed or timed out.
+    """
+    
+    start_time = time.perf_counter()
+    try:
+        api_response = _get_session().get(url=f"{COC_BASE_API_URL}{api_path}",
+                                          headers={
+                                              "Accept": "application/json",
+                                              "Authorization": f"Bearer {get_config().coc_api_token}"
+                                          },
+                                          timeout=COC_API_TIMEOUT_SECONDS)
+    except requests.RequestException:
+        # Count requests that got no response at all as failed requests too.
+        RUN_METRICS.record_http_request(0, time.perf_counter() - start_time, ok=False)
+        raise
+    RUN_METRICS.record_http_request(len(api_response.content), time.perf_counter() - start_time, api_response.ok)
+    return api_response
+
+
+def get_cwl_war_json(war_tag: str) -> dict:
+    """
+    Return the JSON data of a CWL war, reading it from the on-disk cache when the war has
+    already ended and was fetched before.
+    
+    Args:
+        war_tag (str): The war tag of the specific war.
+    
+    Returns:
+        dict: The JSON data of the war.
+    """
+    
+    # Check if this war has ended and is already cached.
+    cache_file_path = f"{CWL_WAR_CACHE_DIRECTORY}/{war_tag.lstrip('#')}.json"
+    if os.path.exists(cache_file_path):
+        RUN_METRICS.record_cache_lookup("wars", hit=True)
+        with open(cache_file_path) as cache_file, RUN_METRICS.thread_stage("decode"):
+            return json.load(cache_file)
+    RUN_METRICS.record_cache_lookup("wars", hit=False)
+    
+    # Get the war data from the Clash of Clans API and cache it if the war has ended.
+    encoded_war_tag = urllib.parse.quote(war_tag)
+    cwl_war_response = get_coc_api_response(f"/clanwarleagues/wars/{encoded_war_tag}")
+    with RUN_METRICS.thread_stage("decode"):
+        cwl_war_json = cwl_war_response.json()
+    
+    if cwl_war_json.get("state") == "warEnded":
+        write_file_atomically(cache_file_path, json.dumps(cwl_war_json))
+    
+    return cwl_war_json
+
+
+def get_player_json(player_tag: str) -> dict | None:
+    """
+    Return the JSON data of a player's profile.
+    
+    Args:
+        player_tag (str): The player tag of the player.
+    
+    Returns:
+        dict | None: The JSON data of the player, or None if it could not be pulled.
+    """
+    
+    encoded_player_tag = urllib.parse.quote(player_tag)
+    player_response = get_coc_api_response(f"/players/{encoded_player_tag}")
+    if not player_response.ok:
+        return None
+    
+    with RUN_METRICS.thread_stage("decode"):
+        return player_response.json()
+
+
+def _get_session() -> requests.Session:
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = requests.Session()
+    return _thread_local.session
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cache
+import os
+
+
+# ====================== Environment / Global Variables =======================
+# Initialize Clash of Clans constant global variables.
+COC_BASE_API_URL = "https://api.clashofclans.com/v1"
+COC_MAX_TOWNHALL_LEVEL = 16
+COC_NO_WAR_TAG = "#0"
+COC_MAX_CONCURRENT_REQUESTS = 8
+
+# How long a Clash of Clans API request may take (to connect, and between bytes of the
+# response) before it fails, so a hung request can't stall the run.
+COC_API_TIMEOUT_SECONDS = 10
+
+# Initialize other constant global variables.
+CWL_DATA_DIRECTORY = "./cwl_data"
+CWL_CACHE_DIRECTORY = f"{CWL_DATA_DIRECTORY}/cache"
+
+
+# =========================== Enumerations / Classes ===========================
+@dataclass(frozen=True)
+class Config:
+    """
+    Represents the settings read from the environment (and the ".env" file).
+    """
+    
+    coc_api_token: str | None
+    coc_clan_tag: str | None
+    google_sheets_spreadsheet_id: str | None
+    metrics_prometheus_file_path: str | None
+
+
+# ================================= Functions =================================
+@cache
+def get_config() -> Config:
+    """
+    Return the settings from the environment, loading the ".env" file the first time
+    they are needed rather than at import time.
+    
+    Returns:
+        Config: The settings for this run.
+    """
+    
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+    
+    return Config(coc_api_token=os.getenv("COC_API_TOKEN"),
+                  coc_clan_tag=os.getenv("COC_CLAN_TAG"),
+                  google_sheets_spreadsheet_id=os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID"),
+                  metrics_prometheus_file_path=os.getenv("METRICS_PROMETHEUS_FILE_PATH") or None)
+
+
+def get_google_sheets_sheet_name() -> str:
+    """
+    Return the name of the sheet for the current month (January, February, March, etc.).
+    """
+    
+    return datetime.today().strftime("%B")
+
+
+def get_cwl_data_file_path(clan_tag: str | None = None) -> str:
+    """
+    Return the path of the current month's .CSV data file.
+    
+    Args:
+        clan_tag (str | None): The clan tag to include in the file name, for runs over
+            several clans. The default file name is used when this is None.
+    
+    Returns:
+        str: The path of the .CSV data file.
+    """
+    
+    return f"{CWL_DATA_DIRECTORY}/{_get_file_name_prefix(clan_tag)}_cwl_performance_data.csv"
+
+
+def get_cwl_run_report_file_path(clan_tag: str | None = None) -> str:
+    """
+    Return the path of the current month's JSON run report.
+    
+    Args:
+        clan_tag (str | None): The clan tag to include in the file name, for runs over
+            several clans. The default file name is used when this is None.
+    
+    Returns:
+        str: The path of the JSON run report.
+    """
+    
+    return f"{CWL_DATA_DIRECTORY}/{_get_file_name_prefix(clan_tag)}_cwl_run_report.json"
+
+
+def get_cwl_event_log_file_path(clan_tag: str | None = None) -> str:
+    """
+    Return the path of the current month's JSON lines event log.
+    
+    Args:
+        clan_tag (str | None): The clan tag to include in the file name, for runs over
+            several clans. The default file name is used when this is None.
+    
+    Returns:
+        str: The path of the JSON lines event log.
+    """
+    
+    return f"{CWL_DATA_DIRECTORY}/{_get_file_name_prefix(clan_tag)}_cwl_events.jsonl"
+
+
+def _get_file_name_prefix(clan_tag: str | None) -> str:
+    file_name_prefix = datetime.today().strftime("%Y_%m")
+    if clan_tag:
+        file_name_prefix += f"_{clan_tag.lstrip('#')}"
+    return file_name_prefix
@@ -0,0 +1,124 @@
+from argparse import ArgumentParser
+import atexit
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, timezone
+from enum import Enum
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+
+# ====================== Environment / Global Variables =======================
+# The logger the analysis records its structured events (member, round, state, attack,
+# rating) to. Until configure_event_log() is called, it drops everything below WARNING.
+EVENT_LOG = logging.getLogger("cwl.events")
+
+# The name of the attribute holding an event's structured fields on a log record.
+EVENT_FIELDS_ATTRIBUTE = "cwl_event"
+
+_event_log_listener: logging.handlers.QueueListener | None = None
+
+
+# =========================== Enumerations / Classes ===========================
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats a log record and its structured event fields as a single line of JSON.
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage()
+        }
+        event.update(getattr(record, EVENT_FIELDS_ATTRIBUTE, {}))
+        return json.dumps(event, default=_to_json_value)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    A queue handler that leaves all formatting to the listener thread, so the code logging
+    the event only pays for putting the record on the queue.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# ================================= Functions =================================
+def _to_json_value(value):
+    # Serialize the analysis objects (enumerations and dataclasses) events refer to.
+    if isinstance(value, Enum):
+        return value.value
+    if is_dataclass(value):
+        return asdict(value)
+    return str(value)
+
+
+def add_verbosity_arguments(parser: ArgumentParser) -> None:
+    """
+    Add the quiet / verbose options to an entry point's argument parser.
+    
+    Args:
+        parser (ArgumentParser): The argument parser of the entry point.
+    """
+    
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-q", "--quiet", action="store_const", dest="verbosity", const=-1, default=0,
+                           help="Only log warnings and errors.")
+    verbosity.add_argument("-v", "--verbose", action="store_const", dest="verbosity", const=1,
+                           help="Also print every event and the performance table to the console.")
+    parser.add_argument("--log-file", metavar="PATH",
+                        help="Where to write the JSON lines event log (default: the current month's file in ./cwl_data).")
+
+
+def configure_event_log(verbosity: int, log_file_path: str) -> None:
+    """
+    Send the events to a JSON lines file (and, when verbose, to the console in a
+    human-readable form) through a queue, so writing them happens on a background thread.
+    
+    Args:
+        verbosity (int): -1 to only log warnings and errors, 0 to also log the analysis
+            events to the file, and 1 to also print them to the console.
+        log_file_path (str): The path of the JSON lines event log.
+    """
+    
+    global _event_log_listener
+    flush_event_log()
+    
+    os.makedirs(os.path.dirname(log_file_path) or ".", exist_ok=True)
+    file_handler = logging.FileHandler(log_file_path)
+    file_handler.setFormatter(JsonLinesFormatter())
+    
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    console_handler.setLevel(logging.DEBUG if verbosity > 0 else logging.WARNING)
+    
+    log_queue = queue.SimpleQueue()
+    EVENT_LOG.handlers = [_DeferredQueueHandler(log_queue)]
+    EVENT_LOG.propagate = False
+    EVENT_LOG.setLevel({-1: logging.WARNING, 0: logging.INFO}.get(verbosity, logging.DEBUG))
+    
+    _event_log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                         respect_handler_level=True)
+    _event_log_listener.start()
+
+
+def flush_event_log() -> None:
+    """
+    Write out every queued event and stop the background thread.
+    """
+    
+    global _event_log_listener
+    if _event_log_listener:
+        _event_log_listener.stop()
+        for handler in _event_log_listener.handlers:
+            handler.close()
+        
+        _event_log_listener = None
+        EVENT_LOG.handlers = []
+
+
+atexit.register(flush_event_log)
@@ -0,0 +1,23 @@
+import os
+
+
+# ================================= Functions =================================
+def write_file_atomically(file_path: str, contents: str) -> None:
+    """
+    Write a text file through a temporary file that replaces it once complete, so readers
+    (e.g. a later run reading a cache, or a Prometheus textfile collector) never see a
+    partially written file, even if the run is interrupted.
+    
+    Args:
+        file_path (str): The path of the file.
+        contents (str): The text to write to the file.
+    """
+    
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    temp_file_path = f"{file_path}.tmp"
+    with open(temp_file_path, "w") as temp_file:
+        temp_file.write(contents)
+    os.replace(temp_file_path, file_path)
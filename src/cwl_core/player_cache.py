@@ -0,0 +1,84 @@
+from cwl_core.config import CWL_CACHE_DIRECTORY
+from cwl_core.files import write_file_atomically
+from cwl_core.run_metrics import RUN_METRICS
+
+from dataclasses import dataclass, field
+import json
+import os
+import threading
+import time
+
+
+# ====================== Environment / Global Variables =======================
+PLAYER_CACHE_FILE_PATH = f"{CWL_CACHE_DIRECTORY}/players.json"
+PLAYER_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+
+# =========================== Enumerations / Classes ===========================
+@dataclass
+class PlayerProfileCache:
+    """
+    Represents the player profiles fetched by earlier runs, kept on disk in a single file
+    so a run can read every cached profile at once. Profiles expire after the TTL.
+    """
+    
+    file_path: str = PLAYER_CACHE_FILE_PATH
+    ttl_seconds: float = PLAYER_CACHE_TTL_SECONDS
+    _entries: dict[str, dict] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _changed: bool = field(default=False, init=False, repr=False)
+    
+    def __post_init__(self):
+        if not os.path.exists(self.file_path):
+            return
+        
+        # A cache that can't be read is treated as empty and replaced on the next save.
+        try:
+            with open(self.file_path) as cache_file:
+                cached_entries = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return
+        
+        # Only keep the entries that have the shape put() writes (e.g. not from an older
+        # version or edited by hand).
+        if isinstance(cached_entries, dict):
+            self._entries = {player_tag: entry for player_tag,entry in cached_entries.items()
+                             if isinstance(entry, dict) and isinstance(entry.get("fetched_at"), (int, float))
+                             and isinstance(entry.get("player"), dict)}
+    
+    def get(self, player_tag: str) -> dict | None:
+        """
+        Return the cached profile of a player if it is still fresh.
+        
+        Args:
+            player_tag (str): The player tag of the player.
+        
+        Returns:
+            dict | None: The cached player JSON, or None if it is missing or expired.
+        """
+        
+        entry = self._entries.get(player_tag)
+        is_fresh = entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds
+        RUN_METRICS.record_cache_lookup("players", hit=is_fresh)
+        return entry["player"] if is_fresh else None
+    
+    def put(self, player_tag: str, player_json: dict) -> None:
+        with self._lock:
+            self._entries[player_tag] = {"fetched_at": time.time(), "player": player_json}
+            self._changed = True
+    
+    def save(self) -> None:
+        """
+        Write the cache back to disk if any profile was added since it was loaded.
+        """
+        
+        with self._lock:
+            if not self._changed:
+                return
+            
+            # Drop expired profiles before writing the cache back.
+            now = time.time()
+            self._entries = {player_tag: entry for player_tag,entry in self._entries.items()
+                             if now - entry["fetched_at"] < self.ttl_seconds}
+            write_file_atomically(self.file_path, json.dumps(self._entries))
+            self._changed = False
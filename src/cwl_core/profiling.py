@@ -0,0 +1,194 @@
+from argparse import ArgumentParser
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import io
+import os
+import profile
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+# ====================== Environment / Global Variables =======================
+PROFILE_OUTPUT_DIRECTORY = "./cwl_data/profiles"
+PROFILE_DEFAULT_TOP_N = 30
+
+# The deepest call stack and the smallest time (in seconds) written to the
+# collapsed-stack file. These keep the file readable on big runs.
+PROFILE_MAX_STACK_DEPTH = 64
+PROFILE_MIN_STACK_SECONDS = 1e-5
+
+
+# =========================== Enumerations / Classes ===========================
+class _ThreadProfile(profile.Profile):
+    """
+    Represents the profile of a single thread. cProfile can't be used: from Python 3.12 on,
+    it sees the calls of every thread as one call stack and garbles the worker threads'
+    timings. The pure-Python profiler is hooked into each thread on its own instead (at
+    the cost of more overhead). Since it follows the thread's actual call stack, it also
+    records the time spent in each full stack for the collapsed-stack file.
+    """
+    
+    def __init__(self):
+        super().__init__(time.perf_counter)
+        self.stack_seconds = dict[tuple, float]()
+    
+    def trace_dispatch_return(self, frame, t):
+        if frame is not self.cur[-2]:
+            # The profiler starts in the middle of a call stack, so skip the returns of the
+            # frames that were already running.
+            if frame is not self.cur[-2].f_back:
+                return 1
+            
+            # The frame returned without its callee's return being seen (e.g. an exception).
+            self.trace_dispatch_return(self.cur[-2], 0)
+        
+        # Add the returning frame's own time to its full stack (skipping the profiler's own
+        # placeholder frames at the root).
+        stack = list[tuple]()
+        stack_entry = self.cur
+        while stack_entry:
+            if not isinstance(stack_entry[-2], profile.Profile.fake_frame):
+                stack.append(stack_entry[-3])
+            stack_entry = stack_entry[-1]
+        stack_key = tuple(reversed(stack))
+        self.stack_seconds[stack_key] = self.stack_seconds.get(stack_key, 0.0) + self.cur[1] + t
+        
+        return super().trace_dispatch_return(frame, t)
+    
+    dispatch = dict(profile.Profile.dispatch, **{"return": trace_dispatch_return,
+                                                  "c_return": trace_dispatch_return,
+                                                  "c_exception": trace_dispatch_return})
+
+
+# ================================= Functions =================================
+def add_profile_arguments(parser: ArgumentParser) -> None:
+    """
+    Add the "--profile" options to an entry point's argument parser.
+    
+    Args:
+        parser (ArgumentParser): The argument parser of the entry point.
+    """
+    
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every thread of the run and trace its allocations, then write hot-path reports.")
+    parser.add_argument("--profile-top", type=int, default=PROFILE_DEFAULT_TOP_N, metavar="N",
+                        help=f"Number of functions / allocation sites in the reports (default: {PROFILE_DEFAULT_TOP_N}).")
+    parser.add_argument("--profile-dir", default=PROFILE_OUTPUT_DIRECTORY, metavar="DIR",
+                        help=f"Directory the profiling reports are written to (default: {PROFILE_OUTPUT_DIRECTORY}).")
+
+
+def profile_run(enabled: bool, run_name: str, top_n: int = PROFILE_DEFAULT_TOP_N,
+                output_directory: str = PROFILE_OUTPUT_DIRECTORY):
+    """
+    Return a context manager that profiles the code run inside it. When profiling is
+    disabled, this is a no-op context manager so the run pays nothing for it.
+    
+    Args:
+        enabled (bool): Whether the run should be profiled.
+        run_name (str): The name used to prefix the report files.
+        top_n (int): The number of functions / allocation sites included in the reports.
+        output_directory (str): The directory the report files are written to.
+    
+    Returns:
+        The context manager to run the profiled code in.
+    """
+    
+    if not enabled:
+        return nullcontext()
+    
+    return _profile_run(run_name, top_n, output_directory)
+
+
+@contextmanager
+def _profile_run(run_name: str, top_n: int, output_directory: str):
+    thread_profilers = list[_ThreadProfile]()
+    
+    def profile_thread(*_) -> None:
+        # Give each thread started during the run (e.g. the API request workers) a
+        # profiler of its own, replacing this hook for the rest of the thread.
+        thread_profiler = _ThreadProfile()
+        thread_profilers.append(thread_profiler)
+        sys.setprofile(thread_profiler.dispatcher)
+    
+    tracemalloc.start()
+    threading.setprofile(profile_thread)
+    profile_thread()
+    try:
+        yield
+    finally:
+        sys.setprofile(None)
+        threading.setprofile(None)
+        allocation_snapshot = tracemalloc.take_snapshot()
+        _, peak_allocated_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        # Merge the profiles of every thread into one set of statistics.
+        profile_stats = pstats.Stats(*thread_profilers)
+        
+        # Write all the reports for this run next to each other.
+        os.makedirs(output_directory, exist_ok=True)
+        report_prefix = os.path.join(output_directory, f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        profile_stats.dump_stats(f"{report_prefix}.prof")
+        _write_function_report(profile_stats, top_n, f"{report_prefix}_functions.txt")
+        _write_allocation_report(allocation_snapshot, peak_allocated_bytes, top_n, f"{report_prefix}_allocations.txt")
+        _write_collapsed_stacks(thread_profilers, f"{report_prefix}.collapsed")
+        print(f"Profiling reports written to {report_prefix}*")
+
+
+def _write_function_report(profile_stats: pstats.Stats, top_n: int, file_path: str) -> None:
+    report = io.StringIO()
+    profile_stats.stream = report
+    profile_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    profile_stats.sort_stats(pstats.SortKey.TIME).print_stats(top_n)
+    
+    with open(file_path, "w") as report_file:
+        report_file.write(report.getvalue())
+
+
+def _write_allocation_report(snapshot: tracemalloc.Snapshot, peak_allocated_bytes: int, top_n: int,
+                             file_path: str) -> None:
+    allocation_sites = snapshot.statistics("lineno")
+    
+    with open(file_path, "w") as report_file:
+        report_file.write(f"Peak traced memory: {peak_allocated_bytes / 1024:.1f} KiB\n")
+        report_file.write(f"Top {top_n} allocation sites still alive at the end of the run:\n")
+        for site_index,allocation_site in enumerate(allocation_sites[:top_n]):
+            frame = allocation_site.traceback[0]
+            report_file.write(f"#{site_index + 1}: {frame.filename}:{frame.lineno} "
+                              f"{allocation_site.size / 1024:.1f} KiB in {allocation_site.count} blocks\n")
+
+
+def _write_collapsed_stacks(thread_profilers: list[_ThreadProfile], file_path: str) -> None:
+    """
+    Write the time spent in each call stack of every thread as collapsed stacks
+    ("frame;frame;frame microseconds" per line) that flamegraph tools (flamegraph.pl,
+    speedscope, inferno) can read.
+    
+    Args:
+        thread_profilers (list[_ThreadProfile]): The profiles of the run's threads.
+        file_path (str): The path of the collapsed-stack file.
+    """
+    
+    # Merge the stacks of every thread, cutting off the deepest frames of very deep stacks.
+    collapsed_stacks = dict[str, float]()
+    for thread_profiler in thread_profilers:
+        for stack,seconds in thread_profiler.stack_seconds.items():
+            stack_key = ";".join(_frame_label(function) for function in stack[:PROFILE_MAX_STACK_DEPTH])
+            collapsed_stacks[stack_key] = collapsed_stacks.get(stack_key, 0.0) + seconds
+    
+    with open(file_path, "w") as collapsed_file:
+        for stack_key,seconds in collapsed_stacks.items():
+            if seconds >= PROFILE_MIN_STACK_SECONDS:
+                collapsed_file.write(f"{stack_key} {int(seconds * 1_000_000)}\n")
+
+
+def _frame_label(function: tuple) -> str:
+    file_name, line_number, function_name = function
+    if file_name in ("~", ""):
+        # Built-in functions have no source file.
+        return function_name
+    
+    return f"{function_name} ({os.path.basename(file_name)}:{line_number})"
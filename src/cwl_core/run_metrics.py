@@ -0,0 +1,207 @@
+from cwl_core.files import write_file_atomically
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import json
+import threading
+import time
+
+
+# =========================== Enumerations / Classes ===========================
+@dataclass
+class StageTiming:
+    """
+    Represents the accumulated time spent in a named stage of a run.
+    """
+    
+    name: str
+    calls: int = 0
+    total_seconds: float = 0.0
+
+
+@dataclass
+class RunMetrics:
+    """
+    Represents the instrumentation data collected over a single run of the analyzer.
+    """
+    
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    stages: dict[str, StageTiming] = field(default_factory=dict)
+    thread_stages: dict[str, StageTiming] = field(default_factory=dict)
+    http_requests: int = 0
+    http_errors: int = 0
+    http_bytes: int = 0
+    http_latencies: list[float] = field(default_factory=list)
+    # Lookups are counted per cache (e.g. "wars", "players").
+    cache_hits: dict[str, int] = field(default_factory=dict)
+    cache_misses: dict[str, int] = field(default_factory=dict)
+    sheets_requests: int = 0
+    sheets_cells_written: int = 0
+    # Stages and requests can be recorded from worker threads, so updates hold this lock.
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Record the wall time spent inside the "with" block under the given stage name.
+        
+        Args:
+            name (str): The name of the stage being timed.
+        """
+        
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_stage(self.stages, name, time.perf_counter() - start_time)
+    
+    @contextmanager
+    def thread_stage(self, name: str):
+        """
+        Record the time spent inside the "with" block under the given stage name, for work
+        that runs on many worker threads at once (e.g. decoding responses). The time is
+        summed across the threads, so it can add up to more than the run's wall time and
+        is reported apart from the wall time stages.
+        
+        Args:
+            name (str): The name of the stage being timed.
+        """
+        
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_stage(self.thread_stages, name, time.perf_counter() - start_time)
+    
+    def reset(self) -> None:
+        """
+        Discard everything recorded so far to start measuring a new run (e.g. each poll of a
+        long-running process).
+        """
+        
+        self.__init__()
+    
+    def _record_stage(self, stages: dict[str, StageTiming], name: str, elapsed_seconds: float) -> None:
+        with self._lock:
+            stage_timing = stages.setdefault(name, StageTiming(name))
+            stage_timing.calls += 1
+            stage_timing.total_seconds += elapsed_seconds
+    
+    def record_http_request(self, response_bytes: int, latency_seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self.http_requests += 1
+            self.http_bytes += response_bytes
+            self.http_latencies.append(latency_seconds)
+            if not ok:
+                self.http_errors += 1
+    
+    def record_cache_lookup(self, cache_name: str, hit: bool) -> None:
+        with self._lock:
+            cache_counts = self.cache_hits if hit else self.cache_misses
+            cache_counts[cache_name] = cache_counts.get(cache_name, 0) + 1
+    
+    def record_sheets_request(self, cells_written: int = 0) -> None:
+        with self._lock:
+            self.sheets_requests += 1
+            self.sheets_cells_written += cells_written
+    
+    def latency_percentile(self, percentile: float) -> float:
+        """
+        Return the given percentile of the recorded HTTP latencies (nearest-rank method).
+        
+        Args:
+            percentile (float): The percentile to compute, between 0 and 100.
+        
+        Returns:
+            float: The latency in seconds, or 0.0 if no requests were recorded.
+        """
+        
+        if not self.http_latencies:
+            return 0.0
+        
+        sorted_latencies = sorted(self.http_latencies)
+        rank = max(1, -(-len(sorted_latencies) * percentile // 100))
+        return sorted_latencies[min(int(rank), len(sorted_latencies)) - 1]
+    
+    def to_report(self) -> dict:
+        """
+        Return the collected metrics as a JSON-serializable run report.
+        """
+        
+        return {
+            "started_at": self.started_at,
+            "stages": {name: {"calls": timing.calls, "seconds": round(timing.total_seconds, 6)}
+                       for name,timing in self.stages.items()},
+            # Summed across the worker threads, so these can exceed the run's wall time.
+            "thread_stages": {name: {"calls": timing.calls, "seconds": round(timing.total_seconds, 6)}
+                              for name,timing in self.thread_stages.items()},
+            "http": {
+                "requests": self.http_requests,
+                "errors": self.http_errors,
+                "bytes": self.http_bytes,
+                "latency_seconds": {
+                    "p50": round(self.latency_percentile(50), 6),
+                    "p90": round(self.latency_percentile(90), 6),
+                    "p99": round(self.latency_percentile(99), 6),
+                    "max": round(max(self.http_latencies, default=0.0), 6)
+                }
+            },
+            "cache": {cache_name: {"hits": self.cache_hits.get(cache_name, 0), "misses": self.cache_misses.get(cache_name, 0)}
+                      for cache_name in sorted(self.cache_hits.keys() | self.cache_misses.keys())},
+            "sheets": {"requests": self.sheets_requests, "cells_written": self.sheets_cells_written}
+        }
+    
+    def to_prometheus(self) -> str:
+        """
+        Return the collected metrics in the Prometheus text exposition format.
+        """
+        
+        lines = ["# HELP cwl_stage_seconds Wall time spent in each stage of the last run.",
+                 "# TYPE cwl_stage_seconds gauge"]
+        lines.extend(f'cwl_stage_seconds{{stage="{name}"}} {timing.total_seconds:.6f}' for name,timing in self.stages.items())
+        lines.extend(["# HELP cwl_thread_stage_seconds Time spent in each worker thread stage of the last run, "
+                      "summed across threads (can exceed wall time).",
+                      "# TYPE cwl_thread_stage_seconds gauge"])
+        lines.extend(f'cwl_thread_stage_seconds{{stage="{name}"}} {timing.total_seconds:.6f}'
+                     for name,timing in self.thread_stages.items())
+        
+        lines.extend(["# HELP cwl_http_requests Clash of Clans API requests made in the last run.",
+                      "# TYPE cwl_http_requests gauge",
+                      f"cwl_http_requests {self.http_requests}",
+                      "# HELP cwl_http_errors Clash of Clans API requests that failed in the last run.",
+                      "# TYPE cwl_http_errors gauge",
+                      f"cwl_http_errors {self.http_errors}",
+                      "# HELP cwl_http_response_bytes Response bytes received from the Clash of Clans API in the last run.",
+                      "# TYPE cwl_http_response_bytes gauge",
+                      f"cwl_http_response_bytes {self.http_bytes}",
+                      "# HELP cwl_http_latency_seconds Clash of Clans API request latency percentiles of the last run.",
+                      "# TYPE cwl_http_latency_seconds gauge"])
+        lines.extend(f'cwl_http_latency_seconds{{quantile="{quantile}"}} {self.latency_percentile(percentile):.6f}'
+                     for quantile,percentile in (("0.5", 50), ("0.9", 90), ("0.99", 99)))
+        
+        lines.extend(["# HELP cwl_cache_lookups Cache lookups made in the last run, by cache.",
+                      "# TYPE cwl_cache_lookups gauge"])
+        for result,cache_counts in (("hit", self.cache_hits), ("miss", self.cache_misses)):
+            lines.extend(f'cwl_cache_lookups{{cache="{cache_name}",result="{result}"}} {count}'
+                         for cache_name,count in sorted(cache_counts.items()))
+        
+        lines.extend(["# HELP cwl_sheets_requests Google Sheets API requests made in the last run.",
+                      "# TYPE cwl_sheets_requests gauge",
+                      f"cwl_sheets_requests {self.sheets_requests}",
+                      "# HELP cwl_sheets_cells_written Google Sheets cells written in the last run.",
+                      "# TYPE cwl_sheets_cells_written gauge",
+                      f"cwl_sheets_cells_written {self.sheets_cells_written}"])
+        
+        return "\n".join(lines) + "\n"
+    
+    def export_json(self, file_path: str) -> None:
+        write_file_atomically(file_path, json.dumps(self.to_report(), indent=2))
+    
+    def export_prometheus(self, file_path: str) -> None:
+        write_file_atomically(file_path, self.to_prometheus())
+
+
+# ============================== Global Variables ==============================
+# The metrics for the current run. Modules record into this shared instance.
+RUN_METRICS = RunMetrics()
@@ -1,38 +1,39 @@
 import coc_api_schema.currentwar_leaguegroup as CWLGroup
 import coc_api_schema.clanwarleagues_wars as CWLWar
-
-from dataclasses import dataclass, field
-from datetime import datetime
+import coc_api_schema.players as Players
+from cwl_core.client import get_coc_api_response, get_cwl_war_json, get_player_json
+from cwl_core.config import (COC_MAX_CONCURRENT_REQUESTS, COC_MAX_TOWNHALL_LEVEL, COC_NO_WAR_TAG, get_config,
+                             get_cwl_data_file_path, get_cwl_event_log_file_path, get_cwl_run_report_file_path,
+                             get_google_sheets_sheet_name)
+from cwl_core.event_log import EVENT_FIELDS_ATTRIBUTE, EVENT_LOG, add_verbosity_arguments, configure_event_log
+from cwl_core.player_cache import PlayerProfileCache
+from cwl_core.profiling import add_profile_arguments, profile_run
+from cwl_core.run_metrics import RUN_METRICS
+
+from argparse import ArgumentParser
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import csv
+from dataclasses import asdict, dataclass, field
 from enum import Enum
+import logging
 import os
 import urllib.parse
 
-from dotenv import load_dotenv
-import gspread,gspread.utils
-from gspread_formatting import *
-import pandas as pd
 import requests
 
 
-# ====================== Environment / Global Variables =======================
-load_dotenv(override=True)
-
-# Initialize Clash of Clans constant global variables.
-COC_API_TOKEN = os.getenv("COC_API_TOKEN")
-COC_BASE_API_URL = "https://api.clashofclans.com/v1"
-COC_CLAN_TAG = os.getenv("COC_CLAN_TAG")
-COC_MAX_TOWNHALL_LEVEL = 16
-COC_NO_WAR_TAG = "#0"
-
-# Initialize Google Sheets constant global variables.
-GOOGLE_SHEETS_SHEET_NAME = datetime.today().strftime("%B")
-GOOGLE_SHEETS_SPREADSHEET_ID = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID")
-
-# Initialize other constant global variables.
-CWL_DATA_FILE_PATH = f"./cwl_data/{datetime.today().strftime("%Y_%m")}_cwl_performance_data.csv"
+# =========================== Enumerations / Classes ===========================
+class CWLGroupNotFoundError(Exception):
+    """
+    Raised when the CWL group of a clan could not be pulled (e.g. the clan is not in CWL).
+    """
+    
+    def __init__(self, clan_tag: str):
+        super().__init__(f"CWL information could not be pulled for {clan_tag}!")
+        self.clan_tag = clan_tag
 
 
-# =========================== Enumerations / Classes ===========================
 class AttackRating(Enum):
     """
     Represents the rating of an attack in CWL.
@@ -83,12 +84,17 @@ class Attack:
 class WarParticipation:
     state: ParticipationState
     attack: Attack | None
+    cell_text: str = field(default="", init=False)
+    
+    def __post_init__(self):
+        # Render the performance table cell as soon as the round is analyzed.
+        self.cell_text = str(self.attack) if self.attack else self.state.value
     
 
 @dataclass
 class PlayerPerformance:
     player: CWLGroup.GroupClanMember
-    sorting_position: int
+    sorting_position: int = field(default=0, init=False)
     war_performances: list[WarParticipation] = field(default_factory=list, init=False)
     total_stars: int = field(default=0, init=False)
     total_destruction_percentage: int = field(default=0, init=False)
@@ -96,6 +102,7 @@ class PlayerPerformance:
     total_participated_attacks: int = field(default=0, init=False)
     total_rounds_placed_into: int = field(default=0, init=False)
     has_participated: bool = field(default=False, init=False)
+    profile: Players.Player | None = field(default=None, init=False)
     
     def add_war_participation(self, war_state: ParticipationState, war_attack: Attack) -> None:
         self.war_performances.append(WarParticipation(war_state, war_attack))
@@ -126,23 +133,86 @@ class CWLAnalysis:
     available_wars: list[CWLWar.CWLWar]
     total_rounds: int
     performances: dict[str, PlayerPerformance] = field(default_factory=dict, init=False)
+    has_player_profiles: bool = field(default=False, init=False)
     
     def __post_init__(self):
-        self.performances = {member.tag:PlayerPerformance(member, self._find_first_map_position(member.tag)) for member in self.clan_members.members}
+        self.performances = {member.tag:PlayerPerformance(member) for member in self.clan_members.members}
+    
+    def add_war(self, war: CWLWar.CWLWar) -> None:
+        self.available_wars.append(war)
+        
+        # Sort members by the map position of the first war they were placed into.
+        for war_member in war.clan.members:
+            performance = self.performances.get(war_member.tag)
+            if performance and not performance.sorting_position:
+                performance.sorting_position = war_member.mapPosition
+    
+    def add_player_profiles(self, player_profiles: dict[str, Players.Player | None]) -> None:
+        for player_tag,player_profile in player_profiles.items():
+            self.performances[player_tag].profile = player_profile
+        self.has_player_profiles = True
     
     def add_player_war_performance(self, player_tag: str, war_attack: Attack) -> None:
         self.performances[player_tag].add_war_participation(ParticipationState.ATTACKED, war_attack)
     
     def add_player_war_state(self, player_tag: str, war_state: ParticipationState) -> None:
         self.performances[player_tag].add_war_participation(war_state, None)
+
+
+class CWLAnalysisSink:
+    """
+    Receives a CWL analysis while it streams through the pipeline: once before the first
+    war arrives, after each round is analyzed (in round order), and once the table is built.
+    """
+    
+    def start(self, cwl_analysis: CWLAnalysis) -> None:
+        pass
+    
+    def round_analyzed(self, cwl_analysis: CWLAnalysis, round_index: int, war: CWLWar.CWLWar) -> None:
+        pass
     
-    def _find_first_map_position(self, player_tag: str) -> int:
-        for war in self.available_wars:
-            for player in war.clan.members:
-                if player.tag == player_tag:
-                    return player.mapPosition
-        return 0
+    def finish(self, cwl_analysis: CWLAnalysis, analysis_header: list[str], performance_table: list[list[str]]) -> None:
+        pass
+
+
+class CSVFileSink(CWLAnalysisSink):
+    """
+    Writes the performance data to a .CSV file (and prints it to the console when verbose).
+    """
+    
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+    
+    def finish(self, cwl_analysis: CWLAnalysis, analysis_header: list[str], performance_table: list[list[str]]) -> None:
+        with RUN_METRICS.stage("write_csv"):
+            if EVENT_LOG.isEnabledFor(logging.DEBUG):
+                print_performance_table(analysis_header, performance_table)
+            write_performance_csv(analysis_header, performance_table, self.file_path)
+        
+        EVENT_LOG.info("Wrote the CWL performance of %d members to %s", len(performance_table), self.file_path,
+                       extra={EVENT_FIELDS_ATTRIBUTE: {"clan": cwl_analysis.clan_members.name, "data_file_path": self.file_path}})
+
+
+class GoogleSheetSink(CWLAnalysisSink):
+    """
+    Pushes the performance data to Google sheets. The libraries are imported and the
+    worksheet is opened in the background while the wars are still being fetched.
+    """
+    
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(1)
+        self._cwl_worksheet_future = None
     
+    def start(self, cwl_analysis: CWLAnalysis) -> None:
+        self._cwl_worksheet_future = self._executor.submit(open_cwl_worksheet)
+    
+    def finish(self, cwl_analysis: CWLAnalysis, analysis_header: list[str], performance_table: list[list[str]]) -> None:
+        try:
+            with RUN_METRICS.stage("create_google_sheet"):
+                create_google_sheet(cwl_analysis, analysis_header, self._cwl_worksheet_future)
+        finally:
+            self._executor.shutdown()
+
     
 # ================================= Functions =================================
 def get_cwl_group(clan_tag: str) -> CWLGroup.CWLGroup:
@@ -154,25 +224,23 @@ def get_cwl_group(clan_tag: str) -> CWLGroup.CWLGroup:
     
     Returns:
         CWLGroup.CWLGroup: The CWL group object for the specified clan.
+    
+    Raises:
+        CWLGroupNotFoundError: If the clan is not in CWL (anymore).
     """
     
     # Encode the clan tag, get the clan CWL data from the Clash of Clans API,
     # and return the hard-typed clan CWL object from the response.
     encoded_clan_tag = urllib.parse.quote(clan_tag)
-    cwl_group_response = requests.get(url=f"{COC_BASE_API_URL}/clans/{encoded_clan_tag}/currentwar/leaguegroup",
-                                      headers={
-                                          "Accept": "application/json",
-                                          "Authorization": f"Bearer {COC_API_TOKEN}"
-                                          }
-                                      )
+    cwl_group_response = get_coc_api_response(f"/clans/{encoded_clan_tag}/currentwar/leaguegroup")
     
     # Check if this clan is done with CWL and have started a new war.
     if cwl_group_response.reason == "Not Found":
-        print('CWL information could not be pulled!')
-        exit()
+        raise CWLGroupNotFoundError(clan_tag)
     
-    cwl_group_json = cwl_group_response.json()
-    return CWLGroup.CWLGroup(**cwl_group_json)
+    with RUN_METRICS.thread_stage("decode"):
+        cwl_group_json = cwl_group_response.json()
+        return CWLGroup.CWLGroup(**cwl_group_json)
 
 
 def get_cwl_war(war_tag: str, home_clan_tag: str) -> CWLWar.CWLWar:
@@ -187,47 +255,143 @@ def get_cwl_war(war_tag: str, home_clan_tag: str) -> CWLWar.CWLWar:
         CWLWar.CWLWar: The CWL war object for the specified war.
     """
     
-    # Encode the war tag, get the war data from the Clash of Clans API, and return the
-    # hard-typed war object from the response.
-    encoded_war_tag = urllib.parse.quote(war_tag)
-    cwl_war_response = requests.get(url=f"{COC_BASE_API_URL}/clanwarleagues/wars/{encoded_war_tag}",
-                                    headers={
-                                        "Accept": "application/json",
-                                        "Authorization": f"Bearer {COC_API_TOKEN}"
-                                    }).json()
-    return CWLWar.CWLWar(home_clan_tag=home_clan_tag, **cwl_war_response)
+    # Get the war data from the Clash of Clans API (or the cache of ended wars), and return
+    # the hard-typed war object from it.
+    cwl_war_json = get_cwl_war_json(war_tag)
+    with RUN_METRICS.thread_stage("decode"):
+        return CWLWar.CWLWar(home_clan_tag=home_clan_tag, war_tag=war_tag, **cwl_war_json)
 
 
-def get_home_cwl_wars(rounds: list[CWLGroup.RoundWarTags], home_clan_tag: str) -> list[CWLWar.CWLWar]:
+def fetch_home_cwl_wars(rounds: list[CWLGroup.RoundWarTags], home_clan_tag: str,
+                        executor: ThreadPoolExecutor) -> Iterator[tuple[int, CWLWar.CWLWar | None]]:
     """
-    Return a list of the CWL wars that our home clan was in for all the rounds of CWL.
-
+    Fetch the wars of every round concurrently and yield our home clan's war of each round
+    as soon as it has been fetched and decoded, in the order the rounds finish.
+    
     Args:
         rounds (list[CWLGroup.RoundWarTags]): A list of all 4 wars happening in a round of CWL.
         home_clan_tag (str): The tag of the clan that we are interested in analyzing (our home clan).
+        executor (ThreadPoolExecutor): The thread pool the wars are fetched on.
+    
+    Yields:
+        tuple[int, CWLWar.CWLWar | None]: The index of a round and our home clan's war in it,
+            or None if our home clan has no war in that round (yet).
+    """
+    
+    # Start fetching every war that has a tag.
+    round_futures = dict[int, list[Future]]()
+    future_rounds = dict[Future, int]()
+    for round_index,round in enumerate(rounds):
+        round_futures[round_index] = [executor.submit(get_cwl_war, war_tag, home_clan_tag)
+                                      for war_tag in round.warTags if war_tag != COC_NO_WAR_TAG]
+        future_rounds.update((future, round_index) for future in round_futures[round_index])
+    
+    # Yield the rounds where no war has a tag yet.
+    for round_index,futures in round_futures.items():
+        if not futures:
+            yield round_index, None
+    
+    # Yield each round once our home clan's war is found or all of the round's wars are in.
+    # Only the time spent waiting on the wars is timed, not the time the caller spends on
+    # each round, so the fetching can be told apart from the analysis in the run report.
+    wars_remaining = {round_index: len(futures) for round_index,futures in round_futures.items()}
+    completed_futures = as_completed(future_rounds)
+    while True:
+        with RUN_METRICS.stage("fetch_wars_wait"):
+            future = next(completed_futures, None)
+        if future is None:
+            break
+        
+        round_index = future_rounds[future]
+        if wars_remaining[round_index] == 0 or future.cancelled():
+            continue
+        
+        wars_remaining[round_index] -= 1
+        cwl_war = future.result()
+        if cwl_war.clan.tag == home_clan_tag:
+            # Skip fetching the rest of this round's wars if they haven't started yet.
+            wars_remaining[round_index] = 0
+            for other_future in round_futures[round_index]:
+                other_future.cancel()
+            yield round_index, cwl_war
+        elif wars_remaining[round_index] == 0:
+            yield round_index, None
+
+
+def get_player_profile(player_tag: str, player_profile_cache: PlayerProfileCache) -> Players.Player | None:
+    """
+    Return a player's profile from the Clash of Clans API as a hard-typed object, adding
+    it to the player profile cache.
+    
+    Args:
+        player_tag (str): The player tag of the player.
+        player_profile_cache (PlayerProfileCache): The cache the profile is added to.
+    
+    Returns:
+        Players.Player | None: The player's profile, or None if it could not be pulled.
+    """
+    
+    # A missing profile only leaves the member's profile cells empty, so don't let a
+    # failed request stop the whole run.
+    try:
+        player_json = get_player_json(player_tag)
+    except requests.RequestException:
+        return None
+    if not player_json:
+        return None
+    
+    with RUN_METRICS.thread_stage("decode"):
+        player_profile = Players.Player.from_json(player_json)
+    player_profile_cache.put(player_tag, asdict(player_profile))
+    return player_profile
+
 
+def fetch_player_profiles(player_tags: list[str], executor: ThreadPoolExecutor,
+                          player_profile_cache: PlayerProfileCache) -> dict[str, Future]:
+    """
+    Start fetching the profiles of the given players on the thread pool. Profiles that are
+    cached and fresh are used as-is without any request.
+    
+    Args:
+        player_tags (list[str]): The player tags of the players.
+        executor (ThreadPoolExecutor): The thread pool the profiles are fetched on.
+        player_profile_cache (PlayerProfileCache): The cache of player profiles.
+    
     Returns:
-        list[CWLWar.CWLWar]: The list of wars that our home clan was in for CWL.
-    """
-    
-    # TODO: Make this asynchronous.
-    # Iterate through each round.
-    home_wars = list[CWLWar.CWLWar]()
-    for round in rounds:
-        # Iterate over each war in this round.
-        for war_tag in round.warTags:
-            # Check if this war does not have a tag yet.
-            if war_tag == COC_NO_WAR_TAG:
-                continue
-            
-            # Get the war data via its war tag.
-            cwl_war = get_cwl_war(war_tag, home_clan_tag)
-            
-            # Check if our home clan is in this war.
-            if cwl_war.clan.tag == home_clan_tag:
-                home_wars.append(cwl_war)
+        dict[str, Future]: The future profile (or None) of each player, by player tag.
+    """
     
-    return home_wars
+    profile_futures = dict[str, Future]()
+    for player_tag in player_tags:
+        cached_player_json = player_profile_cache.get(player_tag)
+        if cached_player_json:
+            profile_futures[player_tag] = Future()
+            profile_futures[player_tag].set_result(Players.Player.from_json(cached_player_json))
+        else:
+            profile_futures[player_tag] = executor.submit(get_player_profile, player_tag, player_profile_cache)
+    
+    return profile_futures
+
+
+def add_player_profiles(cwl_analysis: CWLAnalysis, profile_futures: dict[str, Future],
+                        player_profile_cache: PlayerProfileCache) -> None:
+    """
+    Wait for the players' profiles, attach them to the analysis and save the cache.
+    
+    Args:
+        cwl_analysis (CWLAnalysis): The analysis to attach the profiles to.
+        profile_futures (dict[str, Future]): The future profile of each player, by player tag.
+        player_profile_cache (PlayerProfileCache): The cache of player profiles.
+    """
+    
+    player_profiles = {player_tag: profile_future.result() for player_tag,profile_future in profile_futures.items()}
+    for player_tag,player_profile in player_profiles.items():
+        if not player_profile:
+            EVENT_LOG.warning("The profile of %s could not be pulled!", player_tag,
+                              extra={EVENT_FIELDS_ATTRIBUTE: {"member_tag": player_tag}})
+    
+    cwl_analysis.add_player_profiles(player_profiles)
+    player_profile_cache.save()
 
 
 def rate_attack(attacker: CWLWar.WarClanMember, defender: CWLWar.WarClanMember) -> AttackRating:
@@ -317,58 +481,96 @@ def rate_attack(attacker: CWLWar.WarClanMember, defender: CWLWar.WarClanMember)
     return rating
 
 
-def analyze_cwl_performance(cwl_analysis: CWLAnalysis) -> None:
-    # Iterate through each available war so far during CWL for the clan.
-    for round_index,war in enumerate(cwl_analysis.available_wars):
-        # Iterate through each clan member in the clan.
-        for clan_member in cwl_analysis.clan_members.members:
-            # Check if this clan member is in the war.
-            war_member = war.clan.get_war_member(clan_member.tag)
-            if not war_member:
-                # Member is not in this war.
-                print(f"[{war.clan.name}] [Round {round_index + 1}]: {clan_member.name} NOT IN WAR")
-                cwl_analysis.add_player_war_state(clan_member.tag, ParticipationState.NOT_IN_WAR)
-                continue
-            
-            # Check if this war member did not attack in this war.
-            war_member_attack = war_member.get_attack()
-            if not war_member_attack:
-                # Check if the war has already ended.
-                if war.state == "warEnded":
-                    print(f"[{war.clan.name}] [Round {round_index + 1}]: {war_member.name} DID NOT ATTACK")
-                    cwl_analysis.add_player_war_state(war_member.tag, ParticipationState.DID_NOT_ATTACK)
-                    continue
-                # Check if the war is in the preparation period.
-                elif war.state == "preparation":
-                    print(f"[{war.clan.name}] [Round {round_index + 1}]: {war_member.name} PREPARING")
-                    cwl_analysis.add_player_war_state(war_member.tag, ParticipationState.PREPARING)  
-                    continue
-                # Check if the war is going on right now.
-                elif war.state == "inWar":
-                    print(f"[{war.clan.name}] [Round {round_index + 1}]: {war_member.name} AWAITING ATTACK")
-                    cwl_analysis.add_player_war_state(war_member.tag, ParticipationState.AWAITING_ATTACK)  
-                    continue
-                # The war is in an unknown / unsupported state...
-                else:
-                    print(f"[{war.clan.name}] [Round {round_index + 1}]: {war_member.name} UNKNOWN")
-                    cwl_analysis.add_player_war_state(war_member.tag, ParticipationState.UNKNOWN)
-                    continue
-            
-            # Analyze the war member's performance!
-            opponent = war.opponent.get_war_member(war_member_attack.defenderTag)
-            opponent_map_position = war.opponent.get_war_member_map_position(opponent.tag)
-            war_member_map_position = war.clan.get_war_member_map_position(war_member.tag)
-            attack_rating = rate_attack(war_member, opponent)
-            war_member_attack = Attack(war_member_attack.stars, war_member_attack.destructionPercentage, war_member_attack.duration,
-                            war_member_map_position, opponent.townhallLevel, opponent_map_position, attack_rating)
-            
-            # Add the war member's performance to the analysis.
-            print(f"[{war.clan.name}] [Round {round_index + 1}]: {war_member.name} " \
-                  f"(TH{war_member.townhallLevel}) got a {str(war_member_attack)}")
-            cwl_analysis.add_player_war_performance(war_member.tag, war_member_attack)
-            
-        print("============================================================================")
+def log_member_event(war: CWLWar.CWLWar, round_index: int, player_tag: str, player_name: str, townhall_level: int,
+                     war_state: ParticipationState, war_attack: Attack | None = None) -> None:
+    """
+    Log a clan member's participation in a round of CWL as a structured event.
+    
+    Args:
+        war (CWLWar.CWLWar): The war of this round.
+        round_index (int): The index of the round.
+        player_tag (str): The player tag of the clan member.
+        player_name (str): The name of the clan member.
+        townhall_level (int): The townhall level of the clan member.
+        war_state (ParticipationState): The clan member's participation state in the war.
+        war_attack (Attack | None): The clan member's attack, if they attacked.
+    """
+    
+    # The message is only formatted (and the fields serialized) by the event log's
+    # background thread, so only references are passed along here.
+    event_fields = {"clan": war.clan.name, "round": round_index + 1, "member": player_name, "member_tag": player_tag,
+                    "townhall_level": townhall_level, "state": war_state, "attack": war_attack,
+                    "rating": war_attack.rating if war_attack else None}
+    if war_attack:
+        EVENT_LOG.info("[%s] [Round %d]: %s (TH%d) got a %s", war.clan.name, round_index + 1, player_name, townhall_level,
+                       war_attack, extra={EVENT_FIELDS_ATTRIBUTE: event_fields})
+    else:
+        EVENT_LOG.info("[%s] [Round %d]: %s %s", war.clan.name, round_index + 1, player_name, war_state.value,
+                       extra={EVENT_FIELDS_ATTRIBUTE: event_fields})
+
+
+def analyze_cwl_war(cwl_analysis: CWLAnalysis, round_index: int, war: CWLWar.CWLWar) -> None:
+    """
+    Analyze the home clan members' performance in one round of CWL.
+    
+    Args:
+        cwl_analysis (CWLAnalysis): The analysis to add the round's performances to.
+        round_index (int): The index of the round among the available wars.
+        war (CWLWar.CWLWar): The home clan's war of this round.
+    """
     
+    # Only build the per-member events if the event log records them.
+    log_events = EVENT_LOG.isEnabledFor(logging.INFO)
+    
+    # Iterate through each clan member in the clan.
+    for clan_member in cwl_analysis.clan_members.members:
+        # Check if this clan member is in the war.
+        war_member = war.clan.get_war_member(clan_member.tag)
+        if not war_member:
+            # Member is not in this war.
+            if log_events:
+                log_member_event(war, round_index, clan_member.tag, clan_member.name, clan_member.townHallLevel,
+                                 ParticipationState.NOT_IN_WAR)
+            cwl_analysis.add_player_war_state(clan_member.tag, ParticipationState.NOT_IN_WAR)
+            continue
+        
+        # Check if this war member did not attack in this war.
+        war_member_attack = war_member.get_attack()
+        if not war_member_attack:
+            # Check if the war has already ended.
+            if war.state == "warEnded":
+                war_state = ParticipationState.DID_NOT_ATTACK
+            # Check if the war is in the preparation period.
+            elif war.state == "preparation":
+                war_state = ParticipationState.PREPARING
+            # Check if the war is going on right now.
+            elif war.state == "inWar":
+                war_state = ParticipationState.AWAITING_ATTACK
+            # The war is in an unknown / unsupported state...
+            else:
+                war_state = ParticipationState.UNKNOWN
+            
+            if log_events:
+                log_member_event(war, round_index, war_member.tag, war_member.name, war_member.townhallLevel, war_state)
+            cwl_analysis.add_player_war_state(war_member.tag, war_state)
+            continue
+        
+        # Analyze the war member's performance!
+        opponent = war.opponent.get_war_member(war_member_attack.defenderTag)
+        opponent_map_position = war.opponent.get_war_member_map_position(opponent.tag)
+        war_member_map_position = war.clan.get_war_member_map_position(war_member.tag)
+        attack_rating = rate_attack(war_member, opponent)
+        war_member_attack = Attack(war_member_attack.stars, war_member_attack.destructionPercentage, war_member_attack.duration,
+                        war_member_map_position, opponent.townhallLevel, opponent_map_position, attack_rating)
+        
+        # Add the war member's performance to the analysis.
+        if log_events:
+            log_member_event(war, round_index, war_member.tag, war_member.name, war_member.townhallLevel,
+                             ParticipationState.ATTACKED, war_member_attack)
+        cwl_analysis.add_player_war_performance(war_member.tag, war_member_attack)
+
+
+def add_remaining_rounds(cwl_analysis: CWLAnalysis) -> None:
     # Add the "not in war" state to all the wars where there is no data yet.
     remaining_wars = cwl_analysis.total_rounds - len(cwl_analysis.available_wars)
     for _ in range(0, remaining_wars):
@@ -377,23 +579,27 @@ def analyze_cwl_performance(cwl_analysis: CWLAnalysis) -> None:
             cwl_analysis.add_player_war_state(clan_member.tag, ParticipationState.NOT_IN_WAR)
 
 
+def create_round_header(round_index: int, round_war: CWLWar.CWLWar) -> str:
+    if round_war.state == "preparation":
+        return (f"War {round_index + 1} Performance\n"
+                f"00* 00.00%   |   00* 00.00%\n"
+                f"0/{round_war.teamSize}                 0/{round_war.teamSize}")
+    
+    return (f"War {round_index + 1} Performance\n{round_war.clan.stars}* {round(round_war.clan.destructionPercentage, 2)}%"
+            f"   |   {round_war.opponent.stars}* {round(round_war.opponent.destructionPercentage, 2)}%\n"
+            f"{round_war.clan.attacks}/{round_war.teamSize}                 {round_war.opponent.attacks}/{round_war.teamSize}")
+
+
 def create_data_headers(cwl_analysis: CWLAnalysis) -> list[str]:
     headers = ["Participating Roster", "Townhall Level"]
     
     # Add the appropriate number of rounds to the sheet.
     rounds_remaining = cwl_analysis.total_rounds
     for round_index,round_war in enumerate(cwl_analysis.available_wars):
+        headers.append(create_round_header(round_index, round_war))
+        rounds_remaining -= 1
         if round_war.state == "preparation":
-            headers.append(f"War {round_index + 1} Performance\n"
-                           f"00* 00.00%   |   00* 00.00%\n"
-                           f"0/{round_war.teamSize}                 0/{round_war.teamSize}")
-            rounds_remaining -= 1
             break
-        
-        headers.append(f"War {round_index + 1} Performance\n{round_war.clan.stars}* {round(round_war.clan.destructionPercentage, 2)}%"
-                       f"   |   {round_war.opponent.stars}* {round(round_war.opponent.destructionPercentage, 2)}%\n"
-                       f"{round_war.clan.attacks}/{round_war.teamSize}                 {round_war.opponent.attacks}/{round_war.teamSize}")
-        rounds_remaining -= 1
     
     for round_index in range(len(cwl_analysis.available_wars), len(cwl_analysis.available_wars) + rounds_remaining):
         headers.append(f"War {round_index + 1} Performance\n"
@@ -405,6 +611,12 @@ def create_data_headers(cwl_analysis: CWLAnalysis) -> list[str]:
     headers.append("Overall Stars")
     headers.append("Overall Destruction (%)")
     
+    # Add the player profile columns if the analysis was enriched with them.
+    if cwl_analysis.has_player_profiles:
+        headers.append("Hero Levels")
+        headers.append("War Stars")
+        headers.append("Trophies")
+    
     return headers
 
 
@@ -426,11 +638,7 @@ def create_performance_table(cwl_analysis: CWLAnalysis) -> list[list[str]]:
         
         # Iterate over each of the participant's round performance to add to the row.
         for round_performance in participant_performance.war_performances:
-            if not round_performance.attack:
-                row.append(round_performance.state.value)
-                continue
-            
-            row.append(str(round_performance.attack))
+            row.append(round_performance.cell_text)
         
         # Add how many times the participant attacked over how many rounds they were in.
         row.append(f"{participant_performance.total_participated_attacks}/{participant_performance.total_rounds_placed_into}")
@@ -441,16 +649,78 @@ def create_performance_table(cwl_analysis: CWLAnalysis) -> list[list[str]]:
         # Add how much total destruction % the participant got.
         row.append(f"{participant_performance.total_destruction_percentage}")
         
+        # Add the participant's current hero levels, war stars and trophies.
+        if cwl_analysis.has_player_profiles:
+            profile = participant_performance.profile
+            if profile:
+                row.append(", ".join(f"{''.join(word[0] for word in hero.name.split())} {hero.level}"
+                                     for hero in profile.get_home_heroes()))
+                row.append(f"{profile.warStars}")
+                row.append(f"{profile.trophies}")
+            else:
+                row.extend(["?", "?", "?"])
+        
         performance_data_table.append(row)
     
     return performance_data_table
 
 
-def create_google_sheet(cwl_analysis: CWLAnalysis, analysis_header: list[str]) -> None:
-    gs = gspread.service_account()
+def write_performance_csv(analysis_header: list[str], performance_table: list[list[str]], file_path: str) -> None:
+    """
+    Write the performance data to a .CSV file.
+    
+    Args:
+        analysis_header (list[str]): The headers of the CWL analysis data.
+        performance_table (list[list[str]]): The 2D list of performance data.
+        file_path (str): The path of the .CSV file.
+    """
+    
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "w", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator="\n")
+        csv_writer.writerow(analysis_header)
+        csv_writer.writerows(performance_table)
+
+
+def print_performance_table(analysis_header: list[str], performance_table: list[list[str]]) -> None:
+    # pandas is only needed to pretty-print the table, so only import it here.
+    import pandas as pd
+    
+    print(pd.DataFrame(performance_table, columns=analysis_header))
+
+
+# The Google Sheets libraries are slow to import, so the functions pushing to Google sheets
+# import them themselves and runs that don't push never load them.
+def open_cwl_worksheet() -> tuple:
+    """
+    Return the CWL spreadsheet and the current month's worksheet in it.
+    
+    Returns:
+        tuple[gspread.Spreadsheet, gspread.Worksheet]: The spreadsheet and the worksheet.
+    """
+    
+    import gspread
+    
+    with RUN_METRICS.stage("open_google_sheet"):
+        gs = gspread.service_account()
+        
+        cwl_spreadsheet = gs.open_by_key(get_config().google_sheets_spreadsheet_id)
+        RUN_METRICS.record_sheets_request()
+        cwl_worksheet = cwl_spreadsheet.worksheet(get_google_sheets_sheet_name())
+        RUN_METRICS.record_sheets_request()
+    
+    return cwl_spreadsheet, cwl_worksheet
+
+
+def create_google_sheet(cwl_analysis: CWLAnalysis, analysis_header: list[str], cwl_worksheet_future: Future | None = None) -> None:
+    import gspread.utils
+    from gspread_formatting import CellFormat, Color, ColorStyle, TextFormat, batch_updater
     
-    cwl_spreadsheet = gs.open_by_key(GOOGLE_SHEETS_SPREADSHEET_ID)
-    cwl_worksheet = cwl_spreadsheet.worksheet(GOOGLE_SHEETS_SHEET_NAME)
+    # Use the worksheet that was opened ahead of time, if any.
+    if cwl_worksheet_future:
+        cwl_spreadsheet, cwl_worksheet = cwl_worksheet_future.result()
+    else:
+        cwl_spreadsheet, cwl_worksheet = open_cwl_worksheet()
     format_batch = batch_updater(cwl_spreadsheet)
     
     title_format = CellFormat(textFormat=TextFormat(bold=True), horizontalAlignment='CENTER', verticalAlignment='MIDDLE')
@@ -472,7 +742,6 @@ def create_google_sheet(cwl_analysis: CWLAnalysis, analysis_header: list[str]) -
     
     opponent_clan_names = [war.opponent.name for war in cwl_analysis.available_wars]
     opponent_clan_names.extend(["?" for _ in range(0, cwl_analysis.total_rounds - len(opponent_clan_names))])
-    cwl_worksheet.update(values=[opponent_clan_names], range_name="C1")
     
     # Attack performance formatting.
     sorted_analysis = sorted(cwl_analysis.performances.values(), key=lambda player_performance: player_performance.sorting_position)
@@ -531,55 +800,168 @@ def create_google_sheet(cwl_analysis: CWLAnalysis, analysis_header: list[str]) -
         else:
             war_performance_formatting.append({"range": gspread.utils.rowcol_to_a1(2, round_index + 3), "format": white_bg_format})
     
-    # Send the war headers to Google sheets.
-    cwl_worksheet.update(values=[analysis_header], range_name="A2")
-    
-    # Make a 2D list of strings of the attack data and send it to Google sheets.
+    # Send the opposing clans, the war headers and a 2D list of strings of the attack data
+    # to Google sheets in a single request.
     cwl_performance_table = create_performance_table(cwl_analysis)
-    cwl_worksheet.update(values=cwl_performance_table, range_name="A3")
+    cwl_worksheet.batch_update([{"range": "C1", "values": [opponent_clan_names]},
+                                {"range": "A2", "values": [analysis_header]},
+                                {"range": "A3", "values": cwl_performance_table}])
+    RUN_METRICS.record_sheets_request(len(opponent_clan_names) + len(analysis_header)
+                                      + sum(len(row) for row in cwl_performance_table))
     
     # Send formatting data for the whole sheet to Google sheets.
     format_batch.execute()
+    RUN_METRICS.record_sheets_request()
     cwl_worksheet.batch_format(attack_formatting)
+    RUN_METRICS.record_sheets_request()
     
     if len(war_performance_formatting) > 0:
         cwl_worksheet.batch_format(war_performance_formatting)
+        RUN_METRICS.record_sheets_request()
 
 
-def main():
+def stream_cwl_analysis(cwl_group: CWLGroup.CWLGroup, home_clan_tag: str, sinks: list[CWLAnalysisSink],
+                        player_profile_cache: PlayerProfileCache | None = None) -> CWLAnalysis:
     """
-    This function will analyze the performance of a clan based off the provided clan tag
-    and print the data to the console and a .CSV file.
+    Analyze the home clan's CWL performance while the wars are still being fetched. Each
+    war is analyzed as soon as it is decoded and every earlier round has been analyzed,
+    and the sinks get each round as soon as it has been analyzed.
+    
+    Args:
+        cwl_group (CWLGroup.CWLGroup): The CWL group of the home clan.
+        home_clan_tag (str): The tag of the clan that we are interested in analyzing (our home clan).
+        sinks (list[CWLAnalysisSink]): Where the analysis is sent.
+        player_profile_cache (PlayerProfileCache | None): The cache of player profiles. The
+            analysis is only enriched with the members' profiles if this is given.
+    
+    Returns:
+        CWLAnalysis: The analysis of the home clan's CWL performance.
     """
     
-    # Get all the CWL group information.
-    cwl_group = get_cwl_group(COC_CLAN_TAG)
-    total_rounds = len(cwl_group.rounds)
+    cwl_analysis = CWLAnalysis(cwl_group.get_clan(home_clan_tag), list(), len(cwl_group.rounds))
+    for sink in sinks:
+        sink.start(cwl_analysis)
+    
+    # Rounds can finish fetching out of order, so hold them until every earlier round is analyzed.
+    fetched_rounds = dict[int, CWLWar.CWLWar | None]()
+    next_round_index = 0
+    profile_futures = dict[str, Future]()
+    with ThreadPoolExecutor(COC_MAX_CONCURRENT_REQUESTS) as executor:
+        for round_index,cwl_war in fetch_home_cwl_wars(cwl_group.rounds, home_clan_tag, executor):
+            fetched_rounds[round_index] = cwl_war
+            while next_round_index in fetched_rounds:
+                cwl_war = fetched_rounds.pop(next_round_index)
+                next_round_index += 1
+                if not cwl_war:
+                    continue
+                
+                with RUN_METRICS.stage("analyze_cwl_performance"):
+                    cwl_analysis.add_war(cwl_war)
+                    analyze_cwl_war(cwl_analysis, len(cwl_analysis.available_wars) - 1, cwl_war)
+                for sink in sinks:
+                    sink.round_analyzed(cwl_analysis, len(cwl_analysis.available_wars) - 1, cwl_war)
+                
+                # Queue the profiles of the members who took part in this round for the first
+                # time, behind the wars still being fetched. Only participants are in the table.
+                if player_profile_cache:
+                    new_participant_tags = [war_member.tag for war_member in cwl_war.clan.members
+                                            if war_member.tag not in profile_futures
+                                            and war_member.tag in cwl_analysis.performances
+                                            and cwl_analysis.performances[war_member.tag].has_participated]
+                    profile_futures.update(fetch_player_profiles(new_participant_tags, executor, player_profile_cache))
+        
+        # Attach the participants' profiles once they are all in.
+        if player_profile_cache:
+            with RUN_METRICS.stage("enrich_player_profiles"):
+                add_player_profiles(cwl_analysis, profile_futures, player_profile_cache)
+    
+    # Create the headers and a 2D list of performance data for the CWL analysis.
+    with RUN_METRICS.stage("create_performance_table"):
+        add_remaining_rounds(cwl_analysis)
+        headers = create_data_headers(cwl_analysis)
+        performance_table = create_performance_table(cwl_analysis)
     
-    # Get a reference to our home clan information.
-    home_clan = cwl_group.get_clan(COC_CLAN_TAG)
+    for sink in sinks:
+        sink.finish(cwl_analysis, headers, performance_table)
     
-    # Get a list of wars that involves our home clan.
-    home_wars = get_home_cwl_wars(cwl_group.rounds, COC_CLAN_TAG)
+    return cwl_analysis
+
+
+def run_cwl_analysis(clan_tag: str, data_file_path: str, push_to_google_sheets: bool = True,
+                     enrich_player_profiles: bool = True, extra_sinks: list[CWLAnalysisSink] | None = None,
+                     run_report_file_path: str | None = None) -> CWLAnalysis:
+    """
+    Analyze the CWL performance of a clan's members, write the data to a .CSV file and
+    optionally push it to Google sheets.
     
-    # Analyze the home clan members' CWL performance.
-    cwl_analysis = CWLAnalysis(home_clan, home_wars, total_rounds)
-    analyze_cwl_performance(cwl_analysis)
+    Args:
+        clan_tag (str): The clan tag of the clan to analyze.
+        data_file_path (str): The path of the .CSV data file.
+        push_to_google_sheets (bool): Whether to push the data to Google sheets.
+        enrich_player_profiles (bool): Whether to add the members' current hero levels,
+            war stars and trophies to the analysis.
+        extra_sinks (list[CWLAnalysisSink] | None): More places to send the analysis to.
+            These get each round before the .CSV file and Google sheets do.
+        run_report_file_path (str | None): Where to export the run's metrics to once the
+            run is over, whether it succeeded or not.
     
-    # Create the headers for the CWL analysis data.
-    headers = create_data_headers(cwl_analysis)
+    Returns:
+        CWLAnalysis: The analysis of the clan's CWL performance.
+    """
     
-    # Create a 2D list of performance data.
-    performance_table = create_performance_table(cwl_analysis)
+    try:
+        # Get all the CWL group information.
+        with RUN_METRICS.stage("get_cwl_group"):
+            cwl_group = get_cwl_group(clan_tag)
+        
+        # Fetch, analyze and write out the home clan's wars as they come in.
+        sinks: list[CWLAnalysisSink] = list(extra_sinks or ())
+        sinks.append(CSVFileSink(data_file_path))
+        if push_to_google_sheets:
+            sinks.append(GoogleSheetSink())
+        
+        player_profile_cache = PlayerProfileCache() if enrich_player_profiles else None
+        with RUN_METRICS.stage("stream_cwl_analysis"):
+            return stream_cwl_analysis(cwl_group, clan_tag, sinks, player_profile_cache)
+    finally:
+        # A failed run's metrics (e.g. the API erroring out) are the ones most worth looking at.
+        if run_report_file_path:
+            export_run_metrics(run_report_file_path)
+
+
+def export_run_metrics(run_report_file_path: str) -> None:
+    """
+    Export the run's metrics as a JSON run report and, if configured, for Prometheus.
     
-    # Print the performance data to the console and to a .CSV file.
-    df = pd.DataFrame(performance_table, columns=headers)
-    print(df)
-    df.to_csv(CWL_DATA_FILE_PATH, index=False)
+    Args:
+        run_report_file_path (str): The path of the JSON run report.
+    """
     
-    # Push the performance data to Google sheets.
-    create_google_sheet(cwl_analysis, headers)
+    RUN_METRICS.export_json(run_report_file_path)
+    if get_config().metrics_prometheus_file_path:
+        RUN_METRICS.export_prometheus(get_config().metrics_prometheus_file_path)
+
+
+def main():
+    """
+    This function will analyze the performance of a clan based off the provided clan tag
+    and write the data to a .CSV file (and the console when verbose).
+    """
     
+    try:
+        run_cwl_analysis(get_config().coc_clan_tag, get_cwl_data_file_path(),
+                         run_report_file_path=get_cwl_run_report_file_path())
+    except CWLGroupNotFoundError as error:
+        EVENT_LOG.error(str(error), extra={EVENT_FIELDS_ATTRIBUTE: {"clan_tag": error.clan_tag}})
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
-    main()
+    parser = ArgumentParser(description="Analyze the CWL performance of the clan's members.")
+    add_profile_arguments(parser)
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    configure_event_log(args.verbosity, args.log_file or get_cwl_event_log_file_path())
+    
+    with profile_run(args.profile, "cwl_performance_analyzer", args.profile_top, args.profile_dir):
+        main()
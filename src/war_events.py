@@ -0,0 +1,323 @@
+import coc_api_schema.currentwar_leaguegroup as CWLGroup
+import coc_api_schema.clanwarleagues_wars as CWLWar
+from cwl_core.config import COC_MAX_CONCURRENT_REQUESTS
+from cwl_core.event_log import EVENT_FIELDS_ATTRIBUTE, EVENT_LOG
+from cwl_core.run_metrics import RUN_METRICS
+from cwl_performance_analyzer import AttackRating, CWLAnalysis, CWLAnalysisSink, get_cwl_war, rate_attack
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+import json
+import os
+import socket
+
+import requests
+
+
+# ====================== Environment / Global Variables =======================
+WEBHOOK_TIMEOUT_SECONDS = 5
+
+
+# =========================== Enumerations / Classes ===========================
+class WarEventType(Enum):
+    """
+    Represents the type of a change noticed between two polls of a CWL war.
+    """
+    
+    NEW_ATTACK = "NEW ATTACK"
+    WAR_STATE_CHANGED = "WAR STATE CHANGED"
+    MEMBER_ADDED = "MEMBER ADDED"
+    MEMBER_DROPPED = "MEMBER DROPPED"
+    WAR_ENDED = "WAR ENDED"
+
+
+@dataclass
+class WarEvent:
+    event_type: WarEventType
+    clan_tag: str
+    detected_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat(), init=False)
+    
+    def to_json(self) -> dict:
+        return {key: value.value if isinstance(value, Enum) else value for key,value in asdict(self).items()}
+
+
+@dataclass
+class NewAttackEvent(WarEvent):
+    round_number: int
+    opponent_clan_tag: str
+    attacker_tag: str
+    attacker_name: str
+    attacker_townhall_level: int
+    defender_tag: str
+    defender_townhall_level: int
+    stars: int
+    destruction_percentage: int
+    order: int
+    rating: AttackRating
+
+
+@dataclass
+class WarStateChangedEvent(WarEvent):
+    round_number: int
+    opponent_clan_tag: str
+    previous_state: str
+    state: str
+
+
+@dataclass
+class RosterMemberEvent(WarEvent):
+    member_tag: str
+    member_name: str
+    townhall_level: int
+
+
+@dataclass
+class WarEndedEvent(WarEvent):
+    round_number: int
+    opponent_clan_tag: str
+    stars: int
+    destruction_percentage: float
+    opponent_stars: int
+    opponent_destruction_percentage: float
+
+
+@dataclass
+class _WarSnapshot:
+    state: str
+    attacks: int
+    member_attack_counts: dict[str, int]
+
+
+class WarChangeDetector:
+    """
+    Compares successive polls of the home clan's CWL roster and wars and turns what changed
+    into events. The first time a war (or the roster) is seen only sets the baseline.
+    """
+    
+    def __init__(self):
+        self._war_snapshots = dict[str, _WarSnapshot]()
+        self._roster_tags = None
+        self._roster_members = None
+    
+    def detect_roster_changes(self, home_clan: CWLGroup.GroupClan) -> list[WarEvent]:
+        # Compare the member tags in API order with the last poll's, so an unchanged roster
+        # costs a single tuple comparison and the members are only matched up when it changed.
+        roster_tags = tuple(member.tag for member in home_clan.members)
+        previous_roster_tags, previous_roster_members = self._roster_tags, self._roster_members
+        self._roster_tags, self._roster_members = roster_tags, home_clan.members
+        if previous_roster_tags is None or roster_tags == previous_roster_tags:
+            return list()
+        
+        roster = {member.tag: member for member in home_clan.members}
+        previous_roster = {member.tag: member for member in previous_roster_members}
+        events = list[WarEvent]()
+        for member_tag in roster.keys() - previous_roster.keys():
+            events.append(RosterMemberEvent(WarEventType.MEMBER_ADDED, home_clan.tag, member_tag,
+                                            roster[member_tag].name, roster[member_tag].townHallLevel))
+        for member_tag in previous_roster.keys() - roster.keys():
+            events.append(RosterMemberEvent(WarEventType.MEMBER_DROPPED, home_clan.tag, member_tag,
+                                            previous_roster[member_tag].name, previous_roster[member_tag].townHallLevel))
+        return events
+    
+    def detect_war_changes(self, round_index: int, war: CWLWar.CWLWar) -> list[WarEvent]:
+        war_key = f"{war.preparationStartTime}{war.opponent.tag}"
+        snapshot = self._war_snapshots.get(war_key)
+        if not snapshot:
+            self._war_snapshots[war_key] = _WarSnapshot(war.state, war.clan.attacks,
+                                                        {member.tag: len(member.attacks or ()) for member in war.clan.members})
+            return list()
+        
+        # The war totals tell if anything changed, so most polls stop here.
+        if war.state == snapshot.state and war.clan.attacks == snapshot.attacks:
+            return list()
+        
+        events = list[WarEvent]()
+        if war.state != snapshot.state:
+            events.append(WarStateChangedEvent(WarEventType.WAR_STATE_CHANGED, war.clan.tag, round_index + 1,
+                                               war.opponent.tag, snapshot.state, war.state))
+            if war.state == "warEnded":
+                events.append(WarEndedEvent(WarEventType.WAR_ENDED, war.clan.tag, round_index + 1, war.opponent.tag,
+                                            war.clan.stars, war.clan.destructionPercentage,
+                                            war.opponent.stars, war.opponent.destructionPercentage))
+            snapshot.state = war.state
+        
+        if war.clan.attacks != snapshot.attacks:
+            events.extend(self._detect_new_attacks(round_index, war, snapshot, war.clan.attacks - snapshot.attacks))
+            snapshot.attacks = war.clan.attacks
+        
+        return events
+    
+    def _detect_new_attacks(self, round_index: int, war: CWLWar.CWLWar, snapshot: _WarSnapshot,
+                            new_attack_count: int) -> list[NewAttackEvent]:
+        events = list[NewAttackEvent]()
+        for war_member in war.clan.members:
+            # Stop as soon as every new attack has been found.
+            if len(events) >= new_attack_count:
+                break
+            
+            # Check if this member has attacked since the last poll.
+            attack_count = len(war_member.attacks or ())
+            if attack_count <= snapshot.member_attack_counts.get(war_member.tag, 0):
+                continue
+            
+            snapshot.member_attack_counts[war_member.tag] = attack_count
+            attack = war_member.get_attack()
+            defender = war.opponent.get_war_member(attack.defenderTag)
+            events.append(NewAttackEvent(WarEventType.NEW_ATTACK, war.clan.tag, round_index + 1, war.opponent.tag,
+                                         war_member.tag, war_member.name, war_member.townhallLevel,
+                                         defender.tag, defender.townhallLevel, attack.stars,
+                                         attack.destructionPercentage, attack.order, rate_attack(war_member, defender)))
+        return events
+
+
+class WarEventSink:
+    """
+    Receives the war events noticed in a poll.
+    """
+    
+    def publish(self, events: list[WarEvent]) -> None:
+        pass
+    
+    def close(self) -> None:
+        pass
+
+
+class JSONLinesFileSink(WarEventSink):
+    """
+    Appends each event as a line of JSON to a file.
+    """
+    
+    def __init__(self, file_path: str):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self._event_file = open(file_path, "a")
+    
+    def publish(self, events: list[WarEvent]) -> None:
+        self._event_file.writelines(f"{json.dumps(event.to_json())}\n" for event in events)
+        self._event_file.flush()
+    
+    def close(self) -> None:
+        self._event_file.close()
+
+
+class UnixSocketSink(WarEventSink):
+    """
+    Sends each event as a JSON datagram to a Unix socket. Events are dropped (with a
+    warning) when nothing is listening, so a missing listener never stalls the poll.
+    """
+    
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+    
+    def publish(self, events: list[WarEvent]) -> None:
+        try:
+            for event in events:
+                self._socket.sendto(json.dumps(event.to_json()).encode(), self.socket_path)
+        except OSError as error:
+            EVENT_LOG.warning("Could not send war events to %s: %s", self.socket_path, error,
+                              extra={EVENT_FIELDS_ATTRIBUTE: {"socket_path": self.socket_path}})
+    
+    def close(self) -> None:
+        self._socket.close()
+
+
+class WebhookSink(WarEventSink):
+    """
+    POSTs the events of a poll as a JSON list to a webhook URL.
+    """
+    
+    def __init__(self, url: str):
+        self.url = url
+        self._session = requests.Session()
+    
+    def publish(self, events: list[WarEvent]) -> None:
+        try:
+            self._session.post(self.url, json=[event.to_json() for event in events],
+                               timeout=WEBHOOK_TIMEOUT_SECONDS).raise_for_status()
+        except requests.RequestException as error:
+            EVENT_LOG.warning("Could not send war events to the webhook: %s", error,
+                              extra={EVENT_FIELDS_ATTRIBUTE: {"webhook_url": self.url}})
+    
+    def close(self) -> None:
+        self._session.close()
+
+
+class WarChangePublisher(CWLAnalysisSink):
+    """
+    Publishes what changed since the last poll. During a full analysis, the events go out
+    as soon as a round is analyzed instead of after the slower sinks. In between, poll_wars()
+    re-fetches only the wars that have not ended. The events are sent to the event sinks on
+    a background thread, so a slow sink (e.g. a webhook) never holds up a poll.
+    """
+    
+    def __init__(self, event_sinks: list[WarEventSink]):
+        self.event_sinks = event_sinks
+        self._change_detector = WarChangeDetector()
+        self._home_wars = dict[int, CWLWar.CWLWar]()
+        self._executor = ThreadPoolExecutor(1)
+    
+    def start(self, cwl_analysis: CWLAnalysis) -> None:
+        self._home_wars.clear()
+        with RUN_METRICS.stage("detect_war_changes"):
+            events = self._change_detector.detect_roster_changes(cwl_analysis.clan_members)
+        self._publish(events)
+    
+    def round_analyzed(self, cwl_analysis: CWLAnalysis, round_index: int, war: CWLWar.CWLWar) -> None:
+        self._home_wars[round_index] = war
+        with RUN_METRICS.stage("detect_war_changes"):
+            events = self._change_detector.detect_war_changes(round_index, war)
+        self._publish(events)
+    
+    def poll_wars(self) -> int:
+        """
+        Re-fetch the home clan's wars from the last full analysis that have not ended yet
+        and publish what changed in them. New rounds and roster changes are only noticed by
+        the next full analysis.
+        
+        Returns:
+            int: The number of events published.
+        """
+        
+        live_wars = {round_index: war for round_index,war in self._home_wars.items() if war.state != "warEnded"}
+        with ThreadPoolExecutor(COC_MAX_CONCURRENT_REQUESTS) as executor:
+            war_futures = {round_index: executor.submit(get_cwl_war, war.war_tag, war.clan.tag)
+                           for round_index,war in live_wars.items()}
+        
+        events = list[WarEvent]()
+        for round_index,war_future in sorted(war_futures.items()):
+            war = war_future.result()
+            self._home_wars[round_index] = war
+            with RUN_METRICS.stage("detect_war_changes"):
+                events.extend(self._change_detector.detect_war_changes(round_index, war))
+        self._publish(events)
+        return len(events)
+    
+    def close(self) -> None:
+        # Send out the events still queued before closing the sinks.
+        self._executor.shutdown()
+        for event_sink in self.event_sinks:
+            event_sink.close()
+    
+    def _publish(self, events: list[WarEvent]) -> None:
+        if events:
+            self._executor.submit(publish_war_events, events, self.event_sinks)
+
+
+# ================================= Functions =================================
+def publish_war_events(events: list[WarEvent], sinks: list[WarEventSink]) -> None:
+    """
+    Send the events noticed in a poll to every sink.
+    
+    Args:
+        events (list[WarEvent]): The events noticed in the poll.
+        sinks (list[WarEventSink]): Where the events are sent.
+    """
+    
+    if not events:
+        return
+    
+    for sink in sinks:
+        sink.publish(events)
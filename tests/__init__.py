@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# The modules are run from (and import each other relative to) the "src" directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
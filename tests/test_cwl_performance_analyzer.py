@@ -0,0 +1,44 @@
+import coc_api_schema.currentwar_leaguegroup as CWLGroup
+from cwl_core.config import COC_NO_WAR_TAG
+import cwl_performance_analyzer
+from cwl_performance_analyzer import fetch_home_cwl_wars
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+
+
+# ====================== Environment / Global Variables =======================
+HOME_CLAN_TAG = "#HOME"
+
+
+# =========================== Enumerations / Classes ===========================
+class FetchHomeCWLWarsTest(unittest.TestCase):
+    def test_rounds_are_yielded_as_they_finish(self):
+        # Round 1 is held back until round 2 is yielded, so they must come out of order.
+        round_two_yielded = threading.Event()
+        
+        def get_cwl_war(war_tag: str, home_clan_tag: str) -> SimpleNamespace:
+            if war_tag.startswith("#R1"):
+                round_two_yielded.wait(5)
+            clan_tag = home_clan_tag if war_tag.endswith("HOME") else f"#CLAN{war_tag}"
+            return SimpleNamespace(war_tag=war_tag, clan=SimpleNamespace(tag=clan_tag))
+        
+        rounds = [CWLGroup.RoundWarTags(["#R1W1", "#R1HOME"]),
+                  CWLGroup.RoundWarTags(["#R2HOME", "#R2W1"]),
+                  CWLGroup.RoundWarTags([COC_NO_WAR_TAG, COC_NO_WAR_TAG])]
+        yielded_rounds = list[tuple]()
+        with mock.patch.object(cwl_performance_analyzer, "get_cwl_war", get_cwl_war), ThreadPoolExecutor(4) as executor:
+            for round_index,war in fetch_home_cwl_wars(rounds, HOME_CLAN_TAG, executor):
+                yielded_rounds.append((round_index, war and war.war_tag))
+                if round_index == 1:
+                    round_two_yielded.set()
+        
+        # Each round is yielded once, with the home clan's war (or None if it has none yet).
+        self.assertEqual(yielded_rounds, [(2, None), (1, "#R2HOME"), (0, "#R1HOME")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+from cwl_core.player_cache import PlayerProfileCache
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+# =========================== Enumerations / Classes ===========================
+class PlayerProfileCacheTest(unittest.TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.cache_file_path = os.path.join(temporary_directory.name, "players.json")
+    
+    def test_profiles_expire_after_the_ttl(self):
+        with mock.patch("time.time", return_value=1000.0):
+            player_profile_cache = PlayerProfileCache(self.cache_file_path, ttl_seconds=60)
+            player_profile_cache.put("#A", {"tag": "#A"})
+            player_profile_cache.save()
+        
+        with mock.patch("time.time", return_value=1059.0):
+            self.assertEqual(PlayerProfileCache(self.cache_file_path, ttl_seconds=60).get("#A"), {"tag": "#A"})
+        with mock.patch("time.time", return_value=1060.0):
+            self.assertIsNone(PlayerProfileCache(self.cache_file_path, ttl_seconds=60).get("#A"))
+    
+    def test_expired_profiles_are_dropped_on_save(self):
+        with mock.patch("time.time", return_value=1000.0):
+            player_profile_cache = PlayerProfileCache(self.cache_file_path, ttl_seconds=60)
+            player_profile_cache.put("#A", {"tag": "#A"})
+        with mock.patch("time.time", return_value=1100.0):
+            player_profile_cache.put("#B", {"tag": "#B"})
+            player_profile_cache.save()
+        
+        with open(self.cache_file_path) as cache_file:
+            self.assertEqual(list(json.load(cache_file)), ["#B"])
+    
+    def test_unreadable_cache_is_treated_as_empty(self):
+        for cache_contents in ("{not json", json.dumps(["#A"]), json.dumps({"#A": {"player": {"tag": "#A"}}})):
+            with open(self.cache_file_path, "w") as cache_file:
+                cache_file.write(cache_contents)
+            self.assertIsNone(PlayerProfileCache(self.cache_file_path).get("#A"))
+
+
+if __name__ == "__main__":
+    unittest.main()
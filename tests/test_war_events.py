@@ -0,0 +1,108 @@
+import coc_api_schema.currentwar_leaguegroup as CWLGroup
+import coc_api_schema.clanwarleagues_wars as CWLWar
+from cwl_core.config import COC_MAX_TOWNHALL_LEVEL
+from cwl_performance_analyzer import AttackRating
+from war_events import WarChangeDetector, WarEventType
+
+import unittest
+
+
+# ====================== Environment / Global Variables =======================
+HOME_CLAN_TAG = "#HOME"
+OPPONENT_CLAN_TAG = "#OPPONENT"
+BADGE_URLS = {"small": "", "medium": "", "large": ""}
+
+
+# =========================== Enumerations / Classes ===========================
+class WarChangeDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.change_detector = WarChangeDetector()
+    
+    def test_first_poll_only_sets_the_baseline(self):
+        self.assertEqual(self.change_detector.detect_war_changes(0, make_war("inWar", {1: 3})), [])
+        self.assertEqual(self.change_detector.detect_roster_changes(make_home_clan(["#A", "#B"])), [])
+    
+    def test_unchanged_war_has_no_events(self):
+        self.change_detector.detect_war_changes(0, make_war("inWar", {1: 3}))
+        self.assertEqual(self.change_detector.detect_war_changes(0, make_war("inWar", {1: 3})), [])
+    
+    def test_new_attack(self):
+        self.change_detector.detect_war_changes(2, make_war("inWar", {1: 3}))
+        events = self.change_detector.detect_war_changes(2, make_war("inWar", {1: 3, 3: 2}))
+        
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].event_type, WarEventType.NEW_ATTACK)
+        self.assertEqual(events[0].clan_tag, HOME_CLAN_TAG)
+        self.assertEqual(events[0].round_number, 3)
+        self.assertEqual(events[0].opponent_clan_tag, OPPONENT_CLAN_TAG)
+        self.assertEqual(events[0].attacker_tag, f"{HOME_CLAN_TAG}3")
+        self.assertEqual(events[0].defender_tag, f"{OPPONENT_CLAN_TAG}3")
+        self.assertEqual(events[0].stars, 2)
+        self.assertEqual(events[0].rating, AttackRating.AVERAGE)
+        
+        # The same attack is only reported once.
+        self.assertEqual(self.change_detector.detect_war_changes(2, make_war("inWar", {1: 3, 3: 2})), [])
+    
+    def test_war_state_change(self):
+        self.change_detector.detect_war_changes(0, make_war("preparation"))
+        events = self.change_detector.detect_war_changes(0, make_war("inWar"))
+        
+        self.assertEqual([event.event_type for event in events], [WarEventType.WAR_STATE_CHANGED])
+        self.assertEqual((events[0].previous_state, events[0].state), ("preparation", "inWar"))
+    
+    def test_war_end(self):
+        self.change_detector.detect_war_changes(0, make_war("inWar", {1: 3}))
+        events = self.change_detector.detect_war_changes(0, make_war("warEnded", {1: 3, 2: 1}))
+        
+        self.assertEqual([event.event_type for event in events],
+                         [WarEventType.WAR_STATE_CHANGED, WarEventType.WAR_ENDED, WarEventType.NEW_ATTACK])
+        self.assertEqual((events[1].stars, events[1].opponent_stars), (4, 0))
+    
+    def test_roster_member_added_and_dropped(self):
+        self.change_detector.detect_roster_changes(make_home_clan(["#A", "#B"]))
+        events = self.change_detector.detect_roster_changes(make_home_clan(["#B", "#C"]))
+        
+        self.assertEqual({(event.event_type, event.member_tag) for event in events},
+                         {(WarEventType.MEMBER_ADDED, "#C"), (WarEventType.MEMBER_DROPPED, "#A")})
+        
+        # Only the order of the members changing is not a roster change.
+        self.assertEqual(self.change_detector.detect_roster_changes(make_home_clan(["#C", "#B"])), [])
+
+
+# ================================= Functions =================================
+def make_war(state: str, home_attacks: dict[int, int] | None = None) -> CWLWar.CWLWar:
+    """
+    Return a 3 vs 3 CWL war where the home clan's members at the given map positions
+    attacked the opponent's member at the same map position for the given stars.
+    """
+    
+    home_attacks = home_attacks or dict()
+    
+    def make_war_clan(clan_tag: str, opponent_clan_tag: str, attacks: dict[int, int]) -> dict:
+        members = list[dict]()
+        for map_position in range(1, 4):
+            member = {"tag": f"{clan_tag}{map_position}", "name": f"Player {map_position}",
+                      "townhallLevel": COC_MAX_TOWNHALL_LEVEL, "mapPosition": map_position, "opponentAttacks": 0}
+            if map_position in attacks:
+                member["attacks"] = [{"attackerTag": member["tag"], "defenderTag": f"{opponent_clan_tag}{map_position}",
+                                      "stars": attacks[map_position], "destructionPercentage": 100,
+                                      "order": map_position, "duration": 60}]
+            members.append(member)
+        return {"tag": clan_tag, "name": clan_tag[1:], "badgeUrls": BADGE_URLS, "clanLevel": 10, "attacks": len(attacks),
+                "stars": sum(attacks.values()), "destructionPercentage": 50.0, "members": members}
+    
+    # The home clan is put in the "opponent" slot to check that the war still sees it as the clan.
+    return CWLWar.CWLWar(state=state, teamSize=3, preparationStartTime="20261001T080000.000Z", startTime="",
+                         endTime="", clan=make_war_clan(OPPONENT_CLAN_TAG, HOME_CLAN_TAG, dict()),
+                         opponent=make_war_clan(HOME_CLAN_TAG, OPPONENT_CLAN_TAG, home_attacks), warStartTime="",
+                         home_clan_tag=HOME_CLAN_TAG, war_tag="#WAR")
+
+
+def make_home_clan(member_tags: list[str]) -> CWLGroup.GroupClan:
+    return CWLGroup.GroupClan(tag=HOME_CLAN_TAG, name="Home", clanLevel=10, badgeUrls=BADGE_URLS,
+                              members=[{"tag": member_tag, "name": f"Player {member_tag}", "townHallLevel": 15}
+                                       for member_tag in member_tags])
+
+
+if __name__ == "__main__":
+    unittest.main()